@@ -1,455 +1,9 @@
+import os
+import uuid
+
 import streamlit as st
-from docx import Document
-from docx.enum.style import WD_STYLE_TYPE
-import io
-import re
-from copy import deepcopy
-from docx.oxml.ns import qn
-
-# --- 1. LOGIKA DETEKSI OTOMATIS (HEURISTIC) ---
-def auto_detect_sections(ms_doc):
-    """
-    Mendeteksi bagian naskah secara otomatis dengan fitur:
-    1. Stop-logic pada Afiliasi agar tidak bocor ke Pendahuluan.
-    2. Konversi tanda koma (,) ke titik koma (;) pada Kata Kunci.
-    3. Pemeliharaan label formal untuk Email dan Abstrak.
-    """
-    sections = {
-        "Judul": "", "Author": "", "Afiliasi": "", "Email": "",
-        "Email Korespondensi": "", 
-        "Abstrak": "", "Kata Kunci": "", "Abstract (EN)": "", "Keywords (EN)": ""
-    }
-    
-    # Ambil semua paragraf yang tidak kosong
-    paragraphs = [p.text.strip() for p in ms_doc.paragraphs if p.text.strip()]
-    if not paragraphs:
-        return sections
-
-    # 1. Judul & Author (Posisi baris 1 & 2)
-    sections["Judul"] = paragraphs[0]
-    if len(paragraphs) > 1:
-        sections["Author"] = paragraphs[1]
-
-    import re
-    email_pattern = r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+'
-    
-    afiliasi_list = []
-    found_abstract_start = False # Flag pengunci afiliasi
-
-    # Scan mulai dari baris ke-3
-    for i in range(2, len(paragraphs)):
-        text = paragraphs[i]
-        text_upper = text.upper()
-        
-        # --- A. DETEKSI MARKER ABSTRAK (Marker Berhenti untuk Afiliasi) ---
-        if text_upper.startswith("ABSTRAK") or text_upper.startswith("ABSTRACT"):
-            found_abstract_start = True 
-            
-            # Logika Abstrak Indonesia
-            if text_upper.startswith("ABSTRAK") and not sections["Abstrak"]:
-                content_buffer = []
-                # Ambil teks setelah kata 'Abstrak' di baris yang sama
-                first_line = text[7:].strip(" :-").strip()
-                if first_line: content_buffer.append(first_line)
-                
-                # Ambil baris-baris berikutnya sampai ketemu 'Kata Kunci'
-                for j in range(i + 1, len(paragraphs)):
-                    if "KATA KUNCI" in paragraphs[j].upper(): break
-                    content_buffer.append(paragraphs[j])
-                
-                # Gabungkan dengan label standar (akan di-bold di build_auto_docx)
-                sections["Abstrak"] = f"Abstrak{' '.join(content_buffer)}"
-            
-            # Logika Abstract English
-            elif text_upper.startswith("ABSTRACT") and not sections["Abstract (EN)"]:
-                content_buffer = []
-                first_line = text[8:].strip(" :-").strip()
-                if first_line: content_buffer.append(first_line)
-                
-                for j in range(i + 1, len(paragraphs)):
-                    if "KEYWORDS" in paragraphs[j].upper() or "PENDAHULUAN" in paragraphs[j].upper(): break
-                    content_buffer.append(paragraphs[j])
-                
-                sections["Abstract (EN)"] = f"Abstract{' '.join(content_buffer)}"
-
-        # --- B. LOGIKA KATA KUNCI & KEYWORDS (Standardisasi Titik Koma) ---
-        elif "KATA KUNCI" in text_upper:
-            val = text.split(":", 1)[-1].strip() if ":" in text else text.replace("KATA KUNCI", "").strip()
-            # Bersihkan tanda baca dan ganti koma ke titik koma
-            val = val.replace(",", ";")
-            keywords_cleaned = "; ".join([k.strip() for k in val.split(";") if k.strip()])
-            sections["Kata Kunci"] = f"Kata Kunci: {keywords_cleaned}"
-
-        elif "KEYWORDS" in text_upper:
-            val = text.split(":", 1)[-1].strip() if ":" in text else text.replace("KEYWORDS", "").strip()
-            val = val.replace(",", ";")
-            keywords_cleaned = "; ".join([k.strip() for k in val.split(";") if k.strip()])
-            sections["Keywords (EN)"] = f"Keywords: {keywords_cleaned}"
-
-        # --- C. LOGIKA EMAIL ---
-        elif "@" in text:
-            emails = re.findall(email_pattern, text)
-            if emails:
-                if any(k in text_upper for k in ["CORRESPONDING", "KORESPONDENSI", "*"]):
-                    sections["Email Korespondensi"] = f"Email Penulis Korespondensi: {emails[0]}"
-                elif not sections["Email"]:
-                    sections["Email"] = f"Email: {', '.join(emails)}"
-        
-        # --- D. LOGIKA PENGUMPULAN AFILIASI ---
-        else:
-            # Ambil teks hanya jika gerbang Abstrak belum terbuka
-            if not found_abstract_start and len(text) > 3:
-                afiliasi_list.append(text)
-
-    # Gabungkan semua baris afiliasi dengan baris baru (\n)
-    sections["Afiliasi"] = "\n".join(afiliasi_list)
-    
-    return sections
-
-# --- 2. FUNGSI CLONING (DIPERBAIKI) ---
-def move_body_elements(source_doc, target_doc):
-    import io
-    import re
-    from copy import deepcopy
-    from docx.table import Table
-    
-    start_found = False
-    source_body = source_doc.element.body
-    target_body = target_doc.element.body
-
-    # --- DEFINISI STYLE ---
-    STYLE_SUBJUDUL_UTAMA = "Subjudul_Jurnal"  # Bab 1, 2, 4
-    STYLE_HASIL_PEMBAHASAN = "Sub_Judul"      # Bab 3
-    STYLE_SUBSUB = "Subsubjudul_Jurnal"       # 2.1, 3.1, dst
-    STYLE_ISI = "Isi_Jurnal"                  # Paragraf isi & isi tabel
-
-    # --- DAFTAR MARKER ---
-    METODOLOGI_MARKERS = ["2. METODOLOGI PENELITIAN", "2. RESEARCH METHODOLOGY", "2. METODE PENELITIAN", "2. RESEARCH METHOD"]
-    HASIL_MARKERS = ["3. HASIL DAN PEMBAHASAN", "3. RESULTS AND DISCUSSION", "3. HASIL PENELITIAN DAN PEMBAHASAN", "3. HASIL"]
-    KESIMPULAN_MARKERS = ["4. KESIMPULAN", "4. CONCLUSION", "4. PENUTUP", "KESIMPULAN DAN SARAN"]
-    
-    subsub_pattern = r'^\d+\.\d+'
-
-    # 1. Koleksi Binary Gambar
-    image_blobs = {}
-    for rel in source_doc.part.rels.values():
-        if "image" in rel.target_ref:
-            image_blobs[rel.rId] = rel.target_part.blob
-
-    # 2. Iterasi Elemen
-    for element in source_body.iterchildren():
-        text = ""
-        is_paragraph = element.tag.endswith('p')
-        
-        if is_paragraph:
-            text_parts = [node.text for node in element.iter() if node.tag.endswith('t') and node.text is not None]
-            text = "".join(text_parts).strip()
-            text_upper = text.upper()
-            
-            has_image = element.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}inline') or \
-                        element.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}anchor')
-            
-            if not text and not has_image:
-                continue 
-
-        # Trigger Mulai dari Bab 1
-        if not start_found and is_paragraph and ("1. PENDAHULUAN" in text_upper or "1. INTRODUCTION" in text_upper):
-            start_found = True
-
-        if start_found:
-            # JALUR A: GAMBAR & CAPTION
-            if is_paragraph and has_image:
-                new_p = target_doc.add_paragraph()
-                for run_element in element.iterchildren():
-                    if run_element.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}inline') or \
-                       run_element.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}anchor'):
-                        for node in run_element.iter():
-                            rid = node.get("{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed")
-                            if rid in image_blobs:
-                                image_stream = io.BytesIO(image_blobs[rid])
-                                new_p.add_run().add_picture(image_stream)
-                    t_tags = run_element.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
-                    for t in t_tags:
-                        if t.text:
-                            new_p.add_run(t.text)
-
-                apply_style_to_element(new_p._element, STYLE_ISI)
-                target_body.append(new_p._element)
-
-            # JALUR B: TABEL
-            elif element.tag.endswith('tbl'):
-                new_element = deepcopy(element)
-                new_table = Table(new_element, target_doc)
-                try:
-                    new_table.style = 'Tabel_Jurnal'
-                except:
-                    new_table.style = 'Table Grid'
-                new_table.autofit = True
-                for row in new_table.rows:
-                    for cell in row.cells:
-                        for paragraph in cell.paragraphs:
-                            apply_style_to_element(paragraph._element, STYLE_ISI)
-                target_body.append(new_element)
-
-            # JALUR C: TEKS BIASA (Termasuk Isi Kesimpulan)
-            else:
-                new_element = deepcopy(element)
-                if is_paragraph:
-                    # Cek Judul Bab 3
-                    if any(marker in text_upper for marker in HASIL_MARKERS):
-                        apply_style_to_element(new_element, STYLE_HASIL_PEMBAHASAN)
-                    
-                    # Cek Judul Bab 1, 2, atau 4
-                    elif any(marker in text_upper for marker in (METODOLOGI_MARKERS + KESIMPULAN_MARKERS)) or \
-                         "1. PENDAHULUAN" in text_upper or "1. INTRODUCTION" in text_upper:
-                        apply_style_to_element(new_element, STYLE_SUBJUDUL_UTAMA)
-                    
-                    # Cek Sub-bab (3.1, 4.1, dsb)
-                    elif re.match(subsub_pattern, text) and len(text) < 150:
-                        apply_style_to_element(new_element, STYLE_SUBSUB)
-                    
-                    # SEMUA ISI (Pendahuluan, Metodologi, Pembahasan, KESIMPULAN)
-                    else:
-                        apply_style_to_element(new_element, STYLE_ISI)
-                
-                target_body.append(new_element)
-
-def apply_style_to_element(element, style_name):
-    """
-    Suntik style dan bersihkan format 'sampah' (highlight, shading, color)
-    agar benar-benar mengikuti template.
-    """
-    # 1. Terapkan Style Paragraf
-    pPr = element.get_or_add_pPr()
-    pStyle = pPr.find(qn('w:pStyle'))
-    if pStyle is None:
-        pStyle = pPr.makeelement(qn('w:pStyle'))
-        pPr.insert(0, pStyle)
-    pStyle.set(qn('w:val'), style_name)
-
-    # 2. Bersihkan Shading/Highlight di level Paragraf
-    shd_p = pPr.find(qn('w:shd'))
-    if shd_p is not None:
-        pPr.remove(shd_p)
-
-    # 3. Iterasi ke setiap Run (teks) untuk membersihkan highlight & shading
-    for run in element.findall(qn('w:r')):
-        rPr = run.get_or_add_rPr()
-        
-        # Hapus Highlight (warna stabilo)
-        highlight = rPr.find(qn('w:highlight'))
-        if highlight is not None:
-            rPr.remove(highlight)
-            
-        # Hapus Shading (warna latar belakang/bayangan teks)
-        shading = rPr.find(qn('w:shd'))
-        if shading is not None:
-            rPr.remove(shading)
-
-        # Hapus Warna Teks (agar kembali otomatis mengikuti style template)
-        color = rPr.find(qn('w:color'))
-        if color is not None:
-            rPr.remove(color)
-
-def move_body_elements(source_doc, target_doc):
-    import io
-    import re
-    from copy import deepcopy
-    from docx.table import Table
-    
-    # Status awal: pencarian dimulai dari Pendahuluan
-    start_found = False
-    source_body = source_doc.element.body
-    target_body = target_doc.element.body
-
-    # --- KONFIGURASI NAMA STYLE (SESUAIKAN DENGAN TEMPLATE ANDA) ---
-    STYLE_SUBJUDUL_UTAMA = "Subjudul_Jurnal"  # Untuk Bab 1, 2, 4
-    STYLE_HASIL_PEMBAHASAN = "Sub_Judul"      # Khusus Bab 3
-    STYLE_SUBSUB = "Subsubjudul_Jurnal"       # Untuk 2.1, 3.1, dst
-    STYLE_ISI = "Isi_Jurnal"                  # Paragraf teks & isi tabel
-
-    # --- DAFTAR MARKER DETEKSI BAB ---
-    METODOLOGI_MARKERS = ["2. METODOLOGI PENELITIAN", "2. RESEARCH METHODOLOGY", "2. METODE PENELITIAN", "2. RESEARCH METHOD"]
-    HASIL_MARKERS = ["3. HASIL DAN PEMBAHASAN", "3. RESULTS AND DISCUSSION", "3. HASIL PENELITIAN DAN PEMBAHASAN", "3. HASIL"]
-    KESIMPULAN_MARKERS = ["4. KESIMPULAN", "4. CONCLUSION", "4. PENUTUP", "KESIMPULAN DAN SARAN"]
-    
-    subsub_pattern = r'^\d+\.\d+' # Pola untuk angka seperti 2.1 atau 3.2.1
-
-    # --- 1. PRA-PEMROSESAN: KOLEKSI BINARY GAMBAR ---
-    # Mengambil semua gambar dari naskah asli agar bisa disisipkan ulang secara aman
-    image_blobs = {}
-    for rel in source_doc.part.rels.values():
-        if "image" in rel.target_ref:
-            image_blobs[rel.rId] = rel.target_part.blob
-
-    # --- 2. ITERASI SETIAP ELEMEN DI DALAM NASKAH ASLI ---
-    for element in source_body.iterchildren():
-        text = ""
-        is_paragraph = element.tag.endswith('p')
-        
-        if is_paragraph:
-            # Ambil semua teks di dalam paragraf tanpa merusak format internal
-            text_parts = [node.text for node in element.iter() if node.tag.endswith('t') and node.text is not None]
-            text = "".join(text_parts).strip()
-            text_upper = text.upper()
-            
-            # Deteksi apakah paragraf ini mengandung objek gambar
-            has_image = element.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}inline') or \
-                        element.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}anchor')
-            
-            # Abaikan paragraf kosong yang tidak memiliki gambar
-            if not text and not has_image:
-                continue 
-
-        # TRIGGER MULAI: Hanya proses elemen SETELAH menemukan Pendahuluan
-        if not start_found and is_paragraph and ("1. PENDAHULUAN" in text_upper or "1. INTRODUCTION" in text_upper):
-            start_found = True
-
-        if start_found:
-            # --- JALUR A: PARAGRAF DENGAN GAMBAR (RE-BUILD METHOD) ---
-            if is_paragraph and has_image:
-                new_p = target_doc.add_paragraph()
-                
-                # Iterasi anak elemen (Run) untuk memastikan urutan Gambar -> Teks Caption tetap benar
-                for run_element in element.iterchildren():
-                    # Jika elemen adalah Drawing (Gambar)
-                    if run_element.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}inline') or \
-                       run_element.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}anchor'):
-                        
-                        for node in run_element.iter():
-                            rid = node.get("{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed")
-                            if rid in image_blobs:
-                                image_stream = io.BytesIO(image_blobs[rid])
-                                new_p.add_run().add_picture(image_stream)
-                    
-                    # Jika elemen adalah Text (Caption/Keterangan)
-                    t_tags = run_element.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
-                    for t in t_tags:
-                        if t.text:
-                            new_p.add_run(t.text)
-
-                apply_style_to_element(new_p._element, STYLE_ISI)
-                target_body.append(new_p._element)
-
-            # --- JALUR B: TABEL ---
-            elif element.tag.endswith('tbl'):
-                new_element = deepcopy(element)
-                new_table = Table(new_element, target_doc)
-                
-                # Terapkan Style Tabel dari Template (Pastikan nama style sesuai di Word)
-                try:
-                    new_table.style = 'Tabel_Jurnal'
-                except:
-                    new_table.style = 'Table Grid'
-                
-                new_table.autofit = True
-                
-                # Format font di dalam setiap sel agar konsisten dengan Isi Jurnal
-                for row in new_table.rows:
-                    for cell in row.cells:
-                        for paragraph in cell.paragraphs:
-                            apply_style_to_element(paragraph._element, STYLE_ISI)
-                
-                target_body.append(new_element)
-
-            # --- JALUR C: TEKS BIASA (DEEPCOPY METHOD) ---
-            else:
-                new_element = deepcopy(element)
-                if is_paragraph:
-                    # 1. Cek jika Judul Bab 3 (Hasil & Pembahasan)
-                    if any(marker in text_upper for marker in HASIL_MARKERS):
-                        apply_style_to_element(new_element, STYLE_HASIL_PEMBAHASAN)
-                    
-                    # 2. Cek jika Judul Bab 2 atau Bab 4 (Metodologi / Kesimpulan)
-                    elif any(marker in text_upper for marker in (METODOLOGI_MARKERS + KESIMPULAN_MARKERS)):
-                        apply_style_to_element(new_element, STYLE_SUBJUDUL_UTAMA)
-                    
-                    # 3. Cek jika Sub-bab (Contoh: 3.1 Analisis Data)
-                    elif re.match(subsub_pattern, text) and len(text) < 150:
-                        apply_style_to_element(new_element, STYLE_SUBSUB)
-                    
-                    # 4. Paragraf isi standar
-                    else:
-                        apply_style_to_element(new_element, STYLE_ISI)
-                
-                target_body.append(new_element)
-            
-# --- 3. FUNGSI BUILDER ---
-def build_auto_docx(template_file, manuscript_file, data_map):
-    new_doc = Document(template_file)
-    ms_doc = Document(manuscript_file)
-    
-    # 1. Bersihkan isi template asli
-    for p in new_doc.paragraphs: p._element.getparent().remove(p._element)
-    for t in new_doc.tables: t._element.getparent().remove(t._element)
-
-    # 2. Definisi Pemetaan Style Otomatis sesuai standar Anda
-    style_mapping = {
-        "Judul": "Judul_Jurnal",
-        "Author": "Author_Jurnal",
-        "Afiliasi": "Afiliasi_Jurnal",
-        "Email": "Afiliasi_Jurnal",
-        "Email Korespondensi": "Afiliasi_Jurnal",
-        "Abstrak": "Abstrak_Jurnal",
-        "Kata Kunci": "Abstrak_Jurnal",
-        "Abstract (EN)": "Abstrak_Jurnal",
-        "Keywords (EN)": "Abstrak_Jurnal"
-    }
-
-    # Urutan output di dokumen
-    order = ["Judul", "Author", "Afiliasi", "Email", "Email Korespondensi", 
-             "Abstrak", "Kata Kunci", "Abstract (EN)", "Keywords (EN)"]
-
-    # Label yang harus di-BOLD (hanya kata kuncinya saja)
-    special_labels = {
-        "Abstrak": "Abstrak",
-        "Abstract (EN)": "Abstract",
-        "Kata Kunci": "Kata Kunci:",
-        "Keywords (EN)": "Keywords:"
-    }
-
-    for cat in order:
-        content = data_map.get(cat, "").strip()
-        if content:
-            # Ambil nama style dari mapping, jika tidak ada gunakan 'Normal'
-            target_style_name = style_mapping.get(cat, "Normal")
-            p = new_doc.add_paragraph()
-            
-            try: 
-                p.style = new_doc.styles[target_style_name]
-            except: 
-                # Jika style tidak ditemukan di template, fallback ke Normal
-                p.style = new_doc.styles["Normal"]
-            
-            # Logika Penebalan Parsial
-            if cat in special_labels:
-                label_to_bold = special_labels[cat]
-                if content.startswith(label_to_bold):
-                    run_label = p.add_run(label_to_bold)
-                    run_label.bold = True
-                    
-                    remaining_text = content[len(label_to_bold):]
-                    run_content = p.add_run(remaining_text)
-                    run_content.bold = None 
-                else:
-                    run = p.add_run(content)
-                    run.bold = None
-            else:
-                run = p.add_run(content)
-                run.bold = None
-
-            # Reset Font agar mengikuti settingan Style di Template (Font Name, Size, Color, etc.)
-            for run in p.runs:
-                run.font.name = None
-                run.font.size = None
-
-    # 3. Masukkan Isi Utama (Pendahuluan dst.)
-    move_body_elements(ms_doc, new_doc)
-
-    buffer = io.BytesIO()
-    new_doc.save(buffer)
-    buffer.seek(0)
-    return buffer
+from client import (JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_QUEUED, SERVICE_URL_ENV, ServiceClient,
+                    ServiceError)
 
 # --- 4. UI STREAMLIT ---
 st.set_page_config(page_title="Auto Journal Formatter", layout="wide")
@@ -459,18 +13,82 @@ st.markdown("Sistem mendeteksi bagian naskah dan menerapkan **Style Jurnal** sec
 if 'detected_data' not in st.session_state:
     st.session_state.detected_data = None
 
-# Mapping Style Otomatis (Sama dengan yang di Builder)
-AUTO_STYLE_MAP = {
-    "Judul": "Judul_Jurnal",
-    "Author": "Author_Jurnal",
-    "Afiliasi": "Afiliasi_Jurnal",
-    "Email": "Afiliasi_Jurnal",
-    "Email Korespondensi": "Afiliasi_Jurnal",
-    "Abstrak": "Abstrak_Jurnal",
-    "Kata Kunci": "Abstrak_Jurnal",
-    "Abstract (EN)": "Abstrak_Jurnal",
-    "Keywords (EN)": "Abstrak_Jurnal"
-}
+# Build berjalan di layanan formatter; sesi hanya menyimpan ID job-nya
+if 'build_job_id' not in st.session_state:
+    st.session_state.build_job_id = None
+
+# Unggahan disimpan di store layanan; sesi hanya menyimpan ID-nya (per peran: template/naskah)
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'stored_uploads' not in st.session_state:
+    st.session_state.stored_uploads = {}
+
+
+# Metrik job terakhir per jenis ("Deteksi", "Build") untuk panel sidebar
+if 'job_metrics' not in st.session_state:
+    st.session_state.job_metrics = {}
+
+
+@st.cache_resource
+def get_client():
+    """
+    Klien layanan formatter untuk semua sesi: layanan di FORMATTER_SERVICE_URL bila
+    diset (python service.py), bila tidak layanan dijalankan di proses Streamlit ini.
+    """
+    url = os.environ.get(SERVICE_URL_ENV)
+    if not url:
+        from service import serve_in_background
+        url = serve_in_background().url
+    return ServiceClient(url)
+
+
+client = get_client()
+# Rule pack, style per bagian & bawaan optimasi gambar dari layanan (UI tidak mengimpor formatter)
+options = client.options()
+
+
+def uploaded_id(role, upload):
+    """ID unggahan di store layanan; dikirim sekali per file, atau lagi bila sudah dibuang store."""
+    stored = st.session_state.stored_uploads.get(role)
+    if (stored is not None and stored[0] == upload.file_id
+            and client.has_file(stored[1], st.session_state.session_id)):
+        return stored[1]
+    file_id = client.upload(upload, session=st.session_state.session_id, role=role)["id"]
+    st.session_state.stored_uploads[role] = (upload.file_id, file_id)
+    return file_id
+
+
+def deferred_reader(job_id):
+    """
+    Isi file hasil baru diambil dari layanan saat tombol unduh diklik, bukan di setiap
+    rerun. Streamlit tetap menyimpan data unduhan sebagai bytes di memorinya sendiri
+    (path atau file terbuka pun dibaca utuh), jadi isi respons dikembalikan langsung
+    tanpa salinan tambahan.
+    """
+    def read():
+        return client.download(job_id)
+    return read
+
+
+with st.sidebar:
+    st.header("📐 Aturan Jurnal")
+    # Rule pack = marker awal isi & klasifikasi judul bab (folder rules/)
+    rule_pack = st.selectbox("Rule pack", options["rules"])
+
+    st.header("🖼️ Optimasi Gambar")
+    # Gambar diperkecil ke DPI target selebar kolom template lalu dikompres ulang
+    image_defaults = options["images"]
+    images_on = st.checkbox("Perkecil & kompres gambar", value=False, disabled=not image_defaults["available"],
+                            help=None if image_defaults["available"] else "Layanan belum memasang Pillow")
+    image_dpi = st.number_input("DPI target", min_value=72, max_value=600, value=image_defaults["dpi"], step=25,
+                                disabled=not images_on)
+    image_quality = st.slider("Kualitas JPEG", min_value=30, max_value=95, value=image_defaults["quality"],
+                              disabled=not images_on)
+
+    st.header("📊 Instrumentasi")
+    instrument_on = st.checkbox("Catat waktu & penghitung per tahap", value=False)
+    profile_on = st.checkbox("Simpan profil cProfile per job", value=False, disabled=not instrument_on)
+
 
 u1, u2 = st.columns(2)
 with u1:
@@ -478,10 +96,29 @@ with u1:
 with u2:
     ms_file = st.file_uploader("📝 2. Upload Naskah Mentah", type="docx")
 
-if tpl_file and ms_file:
+# Layanan membaca unggahan dari file di store-nya (bukan salinan bytes per sesi)
+try:
+    tpl_id = uploaded_id("template", tpl_file) if tpl_file else None
+    ms_id = uploaded_id("manuscript", ms_file) if ms_file else None
+except ServiceError as e:
+    st.error(f"Unggahan ditolak: {e}")
+    st.stop()
+
+if tpl_id:
+    # Template di-parse & dicek sekali per isi file di layanan (registry), aman dipanggil tiap rerun
+    missing_styles = client.template(tpl_id, rules=rule_pack)["missing_styles"]
+    if missing_styles:
+        st.warning("Style berikut tidak ditemukan di template dan akan jatuh ke 'Normal': "
+                   + ", ".join(missing_styles))
+
+if tpl_id and ms_id:
     if st.button("🔍 Deteksi Bagian Otomatis", use_container_width=True):
-        doc_ms = Document(ms_file)
-        st.session_state.detected_data = auto_detect_sections(doc_ms)
+        # Cukup bagian depan document.xml yang dibaca (streaming), bukan seluruh naskah
+        detected = client.detect(ms_id, rules=rule_pack, metrics=instrument_on,
+                                 profile=instrument_on and profile_on)
+        st.session_state.detected_data = detected["sections"]
+        if detected["metrics"]:
+            st.session_state.job_metrics["Deteksi"] = detected["metrics"]
 
 if st.session_state.detected_data:
     st.write("---")
@@ -495,20 +132,96 @@ if st.session_state.detected_data:
         with col_grid[i % 2]:
             # Update data jika pengguna melakukan pengeditan manual di text_area
             st.session_state.detected_data[cat] = st.text_area(
-                f"Bagian: {cat} (Style: {AUTO_STYLE_MAP.get(cat)})", 
+                f"Bagian: {cat} (Style: {options['styles'].get(cat)})", 
                 val, 
                 height=150, 
                 key=f"in_{cat}"
             )
 
     if st.button("📥 Generate & Download Naskah", use_container_width=True):
-        # Kita panggil builder dengan data terbaru
-        # Builder sekarang hanya butuh tpl, ms, dan data_map (karena style sudah hardcoded di dalam builder)
-        final_out = build_auto_docx(tpl_file, ms_file, st.session_state.detected_data)
-        st.download_button(
-            label="✅ Klik untuk Unduh Hasil Formating",
-            data=final_out,
-            file_name="Formatted_Journal_Final.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            use_container_width=True
-        )
\ No newline at end of file
+        # Build dikirim ke pool di latar belakang; kiriman identik langsung dapat hasil cache
+        job = client.submit(
+            tpl_id, ms_id, st.session_state.detected_data,
+            rules=rule_pack,
+            optimize_images={"dpi": image_dpi, "quality": image_quality} if images_on else None,
+            metrics=instrument_on, profile=instrument_on and profile_on,
+        )
+        st.session_state.build_job_id = job["id"]
+
+    def current_job():
+        job_id = st.session_state.build_job_id
+        return client.job(job_id) if job_id else None
+
+    job = current_job()
+
+    # Selama job berjalan hanya bagian ini yang dijalankan ulang (polling), bukan seluruh halaman
+    @st.fragment(run_every=0.5 if job is not None and not job["finished"] else None)
+    def build_status():
+        # Info job diambil ulang dari layanan di setiap polling
+        job = current_job()
+        if job is None:
+            return
+        if not job["finished"]:
+            label = "Menunggu worker..." if job["status"] == JOB_QUEUED else "Memproses naskah..."
+            st.progress(job["progress"], text=f"{label} (job {job['id']})")
+            if st.button("⛔ Batalkan", key=f"cancel_{job['id']}"):
+                client.cancel(job["id"])
+            return
+        # Job baru selesai: jalankan ulang halaman agar polling berhenti
+        if st.session_state.get("polled_job_id") == job["id"]:
+            st.session_state.polled_job_id = None
+            st.rerun()
+
+        if job["status"] == JOB_DONE:
+            if job["metrics"]:
+                st.session_state.job_metrics["Build"] = job["metrics"]
+            st.download_button(
+                label="✅ Klik untuk Unduh Hasil Formating",
+                data=deferred_reader(job["id"]),
+                file_name="Formatted_Journal_Final.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                use_container_width=True
+            )
+            if job["images"]:
+                images = job["images"]
+                st.caption(f"🖼️ {images['optimized']} dari {images['images']} gambar dioptimasi "
+                           f"({images['deduplicated']} duplikat digabung), hemat "
+                           f"{images['bytes_saved'] / 1024 / 1024:.1f} MB")
+            # Hasil verifikasi struktur otomatis: isi naskah vs isi hasil
+            fidelity = job["fidelity"]
+            if fidelity is not None and fidelity["ok"]:
+                out = fidelity["output"]
+                st.caption(f"✔️ Verifikasi isi: {out['paragraphs']} paragraf, {out['tables']} tabel "
+                           f"({out['cells']} sel), {out['images']} gambar sesuai naskah")
+            elif fidelity is not None:
+                st.warning(f"Verifikasi isi menemukan {len(fidelity['differences'])} perbedaan "
+                           "antara naskah dan hasil. Periksa hasil sebelum dikirim.")
+                with st.expander("Rincian perbedaan"):
+                    st.json(fidelity, expanded=False)
+        elif job["status"] == JOB_CANCELLED:
+            st.warning("Build dibatalkan.")
+        elif job["status"] == JOB_FAILED:
+            st.error(f"Build gagal: {job['error']}")
+
+    if job is not None and not job["finished"]:
+        st.session_state.polled_job_id = job["id"]
+    build_status()
+
+# --- PANEL METRIK (SIDEBAR) ---
+if instrument_on:
+    with st.sidebar:
+        if not st.session_state.job_metrics:
+            st.caption("Belum ada job yang tercatat.")
+        for label, job in st.session_state.job_metrics.items():
+            st.subheader(f"{label} · {job['job_id']}")
+            st.dataframe(
+                {"Tahap": list(job["timings"]),
+                 "Waktu (ms)": [round(v * 1000, 1) for v in job["timings"].values()]},
+                hide_index=True, use_container_width=True,
+            )
+            st.json(job["counters"], expanded=False)
+            if job["profile"] and os.path.exists(job["profile"]):
+                with open(job["profile"], "rb") as f:
+                    st.download_button("⬇️ Profil cProfile", f.read(),
+                                       file_name=f"{job['job_id']}.prof",
+                                       key=f"prof_{label}")
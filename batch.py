@@ -0,0 +1,238 @@
+# Mode batch (tanpa UI): format banyak naskah sekaligus terhadap satu template.
+#
+# Contoh:
+#   python batch.py template.docx naskah/ -o hasil/
+#   python batch.py template.docx "edisi_12/*.docx" -o hasil/ -j 8
+#   python batch.py template.docx naskah/ -o hasil/ --metrics --profile-dir profil/
+#   python batch.py template.docx naskah/ -o pratinjau/ --preview
+#   python batch.py template.docx naskah/ -o hasil/ --rules lima_bab
+#   python batch.py template.docx naskah/ -o hasil/ --optimize-images --image-dpi 150 --image-quality 80
+#   python batch.py template.docx edisi_12/ -o hasil/ --issue edisi_12.docx
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+from formatter import (assemble_issue, auto_detect_sections, build_auto_docx, enable_metrics_log, get_rule_pack,
+                       instrument, TEMPLATE_REGISTRY)
+from fidelity import IMAGES_COUNT, IMAGES_HASH, verify_output
+from images import DEFAULT_DPI, DEFAULT_JPEG_QUALITY, image_options
+
+# Template disiapkan (dikosongkan & dicek style-nya) dan rule pack dikompilasi sekali per worker
+_TEMPLATE = None
+_RULES = None
+_IMAGE_OPTIONS = None
+
+
+def collect_manuscripts(inputs):
+    """Kumpulkan file .docx dari daftar path file, direktori, atau pola glob."""
+    found = []
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = glob.glob(os.path.join(item, "*.docx"))
+        else:
+            candidates = glob.glob(item) or [item]
+        for path in sorted(candidates):
+            # Lewati file kunci sementara milik Word (~$naskah.docx)
+            if os.path.basename(path).startswith("~$"):
+                continue
+            # File yang sama lewat dua pola/path berbeda hanya diformat sekali
+            real = os.path.realpath(path)
+            if real not in seen:
+                seen.add(real)
+                found.append(path)
+    return found
+
+
+def output_names(paths):
+    """
+    Nama dasar keluaran (hasil .docx, laporan JSON, profil) per naskah: nama file
+    tanpa ekstensi, atau path relatif terhadap direktori bersama ("/" -> "__") bila
+    ada nama file yang sama di direktori berbeda, agar hasilnya tidak saling timpa.
+    """
+    names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    if len(set(names)) < len(names):
+        base = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+        names = [os.path.splitext(os.path.relpath(os.path.abspath(path), base))[0].replace(os.sep, "__")
+                 for path in paths]
+    if len(set(names)) < len(names):
+        names = [f"{index:03d}_{name}" for index, name in enumerate(names, 1)]
+    return dict(zip(paths, names))
+
+
+def _init_worker(template_path, log_metrics=False, rules=None, image_opts=None):
+    global _TEMPLATE, _RULES, _IMAGE_OPTIONS
+    _TEMPLATE = TEMPLATE_REGISTRY.get(template_path)
+    _RULES = get_rule_pack(rules)
+    _IMAGE_OPTIONS = image_opts
+    if log_metrics:
+        enable_metrics_log()
+
+
+def format_one(ms_path, out_dir, metrics=False, profile_dir=None, preview=False, verify=True, name=None):
+    """
+    Deteksi + build satu naskah, tulis hasil .docx dan laporan JSON-nya.
+    Dengan `metrics` (atau `profile_dir`) job diinstrumentasi dan metriknya
+    ikut masuk laporan; `profile_dir` juga menyimpan profil cProfile per naskah.
+    `preview` hanya menjalankan deteksi (tanpa .docx keluaran). Bila optimasi
+    gambar aktif, ringkasannya (byte dihemat dst.) masuk laporan di "images".
+    Dengan `verify` hasil dicek terhadap naskahnya; laporannya di "fidelity".
+    `name` = nama dasar file keluaran (bawaan: nama file naskah, lihat output_names).
+    """
+    name = name or os.path.splitext(os.path.basename(ms_path))[0]
+    out_path = os.path.join(out_dir, f"{name}_formatted.docx")
+    report_path = os.path.join(out_dir, f"{name}.json")
+    report = {"manuscript": ms_path, "output": None, "sections": None, "timings": {}, "error": None,
+              "missing_styles": _TEMPLATE.missing_styles_for(_RULES)}
+    timings = report["timings"]
+
+    job = nullcontext()
+    if metrics or profile_dir:
+        profile_path = os.path.join(profile_dir, f"{name}.prof") if profile_dir else None
+        job = instrument(job_id=name, profile_path=profile_path)
+
+    with job as job_metrics:
+        try:
+            # Naskah dibaca langsung dari file (tanpa salinan bytes utuh di memori):
+            # deteksi membaca document.xml secara streaming (tanpa parse penuh)
+            t0 = time.perf_counter()
+            sections = auto_detect_sections(ms_path, rules=_RULES)
+            timings["detect"] = time.perf_counter() - t0
+            report["sections"] = sections
+
+            if not preview:
+                # Hasil ditulis langsung ke file keluaran (parse naskah termasuk dalam waktu build)
+                t0 = time.perf_counter()
+                build_auto_docx(_TEMPLATE, ms_path, sections, output=out_path, rules=_RULES,
+                                optimize_images=_IMAGE_OPTIONS, report=report)
+                timings["build"] = time.perf_counter() - t0
+                report["output"] = out_path
+
+                if verify:
+                    t0 = time.perf_counter()
+                    report["fidelity"] = verify_output(
+                        ms_path, out_path, _RULES, images=IMAGES_COUNT if _IMAGE_OPTIONS else IMAGES_HASH)
+                    timings["verify"] = time.perf_counter() - t0
+        except Exception as e:
+            report["error"] = f"{type(e).__name__}: {e}"
+
+    timings["total"] = sum(timings.values())
+    if job_metrics is not None:
+        report["metrics"] = job_metrics.as_dict()
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Format banyak naskah sekaligus dengan satu template jurnal.")
+    parser.add_argument("template", help="File template jurnal (.docx)")
+    parser.add_argument("manuscripts", nargs="+", help="File, direktori, atau pola glob naskah (.docx)")
+    parser.add_argument("-o", "--output", required=True, help="Direktori keluaran")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Jumlah proses worker (default: jumlah core)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Catat waktu & penghitung per tahap ke laporan dan log JSON (stderr)")
+    parser.add_argument("--profile-dir", help="Simpan profil cProfile per naskah ke direktori ini")
+    parser.add_argument("--rules", default=None,
+                        help="Rule pack jurnal: nama di folder rules/ atau path file JSON (default: bawaan)")
+    parser.add_argument("--preview", action="store_true",
+                        help="Hanya deteksi bagian depan (laporan JSON), tanpa membuat .docx")
+    parser.add_argument("--no-verify", action="store_true",
+                        help="Lewati verifikasi isi hasil terhadap naskah (teks, tabel, gambar)")
+    parser.add_argument("--issue", metavar="EDISI.docx",
+                        help="Gabungkan semua hasil (urut nama file) menjadi satu dokumen edisi")
+    parser.add_argument("--optimize-images", action="store_true",
+                        help="Perkecil gambar ke DPI target selebar kolom template & kompres ulang (butuh Pillow)")
+    parser.add_argument("--image-dpi", type=int, default=DEFAULT_DPI,
+                        help=f"DPI target optimasi gambar (default: {DEFAULT_DPI})")
+    parser.add_argument("--image-quality", type=int, default=DEFAULT_JPEG_QUALITY,
+                        help=f"Kualitas JPEG 1-95 untuk optimasi gambar (default: {DEFAULT_JPEG_QUALITY})")
+    args = parser.parse_args(argv)
+
+    manuscripts = collect_manuscripts(args.manuscripts)
+    if not manuscripts:
+        parser.error("tidak ada naskah .docx yang ditemukan")
+    if args.issue and args.preview:
+        parser.error("--issue tidak bisa dipakai bersama --preview")
+
+    os.makedirs(args.output, exist_ok=True)
+    if args.profile_dir:
+        os.makedirs(args.profile_dir, exist_ok=True)
+    try:
+        rules = get_rule_pack(args.rules)
+        image_opts = None
+        if args.optimize_images:
+            # Worker gambar per naskah: proses batch sudah paralel per naskah
+            image_opts = image_options({"dpi": args.image_dpi, "quality": args.image_quality, "workers": 1})
+    except (ValueError, ImportError) as e:
+        parser.error(str(e))
+
+    missing_styles = TEMPLATE_REGISTRY.get(args.template).missing_styles_for(rules)
+    if missing_styles:
+        print(f"PERINGATAN: style tidak ada di template: {', '.join(missing_styles)}", file=sys.stderr)
+
+    failed = 0
+    mismatched = 0
+    bytes_saved = 0
+    outputs = {}
+    started = time.perf_counter()
+    workers = max(1, min(args.jobs, len(manuscripts)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(args.template, args.metrics or bool(args.profile_dir), rules.spec,
+                                       image_opts)) as pool:
+        names = output_names(manuscripts)
+        futures = [pool.submit(format_one, path, args.output, args.metrics, args.profile_dir, args.preview,
+                               not args.no_verify, names[path])
+                   for path in manuscripts]
+        for future in as_completed(futures):
+            report = future.result()
+            outputs[report["manuscript"]] = report["output"]
+            if report["error"]:
+                failed += 1
+                print(f"GAGAL  {report['manuscript']}: {report['error']}", file=sys.stderr)
+                continue
+            if report.get("fidelity") and not report["fidelity"]["ok"]:
+                mismatched += 1
+                print(f"PERINGATAN {report['manuscript']}: {len(report['fidelity']['differences'])} perbedaan "
+                      f"isi naskah vs hasil (lihat laporan JSON)", file=sys.stderr)
+            if report.get("images"):
+                saved = report["images"]["bytes_saved"]
+                bytes_saved += saved
+                print(f"OK     {report['manuscript']} ({report['timings']['total']:.2f}s, "
+                      f"gambar -{saved / 1024 / 1024:.1f} MB)")
+            else:
+                print(f"OK     {report['manuscript']} ({report['timings']['total']:.2f}s)")
+
+    elapsed = time.perf_counter() - started
+    print(f"{len(manuscripts) - failed}/{len(manuscripts)} naskah selesai dalam {elapsed:.2f}s "
+          f"dengan {workers} worker")
+    if mismatched:
+        print(f"{mismatched} hasil tidak lolos verifikasi isi", file=sys.stderr)
+    if args.optimize_images:
+        print(f"Optimasi gambar menghemat {bytes_saved / 1024 / 1024:.1f} MB")
+
+    if args.issue:
+        if failed:
+            print("Edisi tidak dirakit karena ada naskah yang gagal", file=sys.stderr)
+            return 1
+        # Artikel dibaca satu per satu dari hasil di disk, sesuai urutan naskah
+        started = time.perf_counter()
+        job = nullcontext()
+        if args.metrics:
+            enable_metrics_log()
+            job = instrument(job_id="edisi")
+        with job:
+            assemble_issue(args.template, [outputs[path] for path in manuscripts], output=args.issue)
+        print(f"Edisi {args.issue} ({len(manuscripts)} artikel) dirakit dalam "
+              f"{time.perf_counter() - started:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
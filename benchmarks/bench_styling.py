@@ -0,0 +1,51 @@
+# Benchmark styling isi: apply_styles_bulk (satu lintasan) vs apply_style_to_element
+# per paragraf, pada naskah sintetis dengan ribuan paragraf.
+#
+#   python -m benchmarks.bench_styling --paragraphs 6000 --repeat 3
+import argparse
+import io
+
+from docx import Document
+
+from benchmarks.common import time_move
+from formatter import load_document
+
+
+def make_manuscript(paragraphs, tables):
+    doc = Document()
+    doc.add_paragraph("Judul")
+    doc.add_paragraph("1. PENDAHULUAN")
+    for i in range(paragraphs):
+        p = doc.add_paragraph(f"Paragraf isi {i} ")
+        run = p.add_run("teks dengan highlight")
+        run.font.highlight_color = 7
+        if i % 50 == 10:
+            doc.add_paragraph(f"2.{i} Sub bab")
+    for _ in range(tables):
+        table = doc.add_table(rows=10, cols=4)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = "sel"
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark styling isi: massal vs per elemen.")
+    parser.add_argument("--paragraphs", type=int, default=6000)
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    ms_doc = load_document(make_manuscript(args.paragraphs, args.tables))
+    per_element = time_move(ms_doc, args.repeat, bulk_styling=False)
+    bulk = time_move(ms_doc, args.repeat, bulk_styling=True)
+
+    print(f"paragraf: {args.paragraphs}, tabel: {args.tables} (terbaik dari {args.repeat})")
+    print(f"per elemen : {per_element:.3f}s")
+    print(f"massal     : {bulk:.3f}s  ({per_element / bulk:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
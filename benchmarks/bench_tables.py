@@ -0,0 +1,53 @@
+# Benchmark jalur tabel move_body_elements: XML langsung (table_fast_path) vs
+# docx.table.Table -> rows -> cells, pada tabel panjang dengan sel merge.
+#
+#   python -m benchmarks.bench_tables --tables 5 --rows 300
+import argparse
+import io
+
+from docx import Document
+
+from benchmarks.common import time_move
+from formatter import load_document
+
+
+def make_manuscript(tables, rows, cols):
+    doc = Document()
+    doc.add_paragraph("Judul")
+    doc.add_paragraph("1. PENDAHULUAN")
+    for t in range(tables):
+        doc.add_paragraph(f"Tabel {t + 1}. Statistik deskriptif")
+        table = doc.add_table(rows=rows, cols=cols)
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                cell.text = "0.123"
+                # Kolom pertama merge vertikal per 5 baris (di XML langsung, karena
+                # _Cell.merge sendiri kuadratik untuk tabel sepanjang ini)
+                if c == 0 and r > 0:
+                    cell._tc.vMerge = "restart" if (r - 1) % 5 == 0 else "continue"
+        # Header merge horizontal
+        table.cell(0, 0).merge(table.cell(0, cols - 1))
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark jalur tabel: XML langsung vs python-docx Table.")
+    parser.add_argument("--tables", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--cols", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    ms_doc = load_document(make_manuscript(args.tables, args.rows, args.cols))
+    slow = time_move(ms_doc, args.repeat, table_fast_path=False)
+    fast = time_move(ms_doc, args.repeat, table_fast_path=True)
+
+    print(f"tabel: {args.tables} x {args.rows} baris x {args.cols} kolom (terbaik dari {args.repeat})")
+    print(f"python-docx Table : {slow:.3f}s")
+    print(f"XML langsung      : {fast:.3f}s  ({slow / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
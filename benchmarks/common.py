@@ -0,0 +1,18 @@
+# Utilitas bersama benchmark khusus (bench_styling, bench_tables).
+import time
+
+from docx import Document
+
+from formatter import move_body_elements
+
+
+def time_move(ms_doc, repeat, **options):
+    """Waktu terbaik dari `repeat` kali move_body_elements(ms_doc, dokumen baru, **options)."""
+    best = None
+    for _ in range(repeat):
+        target = Document()
+        started = time.perf_counter()
+        move_body_elements(ms_doc, target, **options)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
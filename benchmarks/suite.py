@@ -0,0 +1,152 @@
+# Benchmark pipeline formatter per tahap (parse, detect, template, move_body, build, rebuild)
+# pada naskah sintetis, dengan waktu (terbaik dari N) dan memori puncak (tracemalloc),
+# dibandingkan terhadap baseline JSON yang tersimpan. Berjalan offline.
+#
+#   python -m benchmarks.suite --save-baseline          # rekam baseline mesin ini
+#   python -m benchmarks.suite                          # bandingkan; exit 1 bila regresi
+#   python -m benchmarks.suite --scenario large --repeat 5
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from formatter import (DOCUMENT_CACHE, TEMPLATE_REGISTRY, BODY_CACHE, load_document, auto_detect_sections,
+                       move_body_elements, build_auto_docx)
+from benchmarks.synthetic import generate_manuscript, generate_template
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Selisih waktu di bawah ini dianggap noise, berapa pun persentasenya
+MIN_SECONDS_DELTA = 0.005
+
+SCENARIOS = {
+    "small": dict(paragraphs=40, heading_depth=2, tables=1, table_rows=5, images=1, image_size=128),
+    "medium": dict(paragraphs=400, heading_depth=3, tables=8, table_rows=20, images=10, image_size=512),
+    "large": dict(paragraphs=3000, heading_depth=3, tables=30, table_rows=100, images=40, image_size=1024),
+    "english": dict(paragraphs=400, heading_depth=2, tables=8, table_rows=20, images=10, image_size=512,
+                    languages=("en", "id")),
+}
+
+
+def stages(ms_bytes, tpl_bytes):
+    """Tahap pipeline sebagai fungsi tanpa argumen, dijalankan berurutan."""
+    state = {}
+
+    def parse():
+        DOCUMENT_CACHE.clear()
+        state["ms_doc"] = load_document(ms_bytes)
+
+    def detect():
+        # Jalur yang dipakai UI & batch: streaming langsung dari bytes naskah
+        state["sections"] = auto_detect_sections(ms_bytes)
+
+    def template():
+        TEMPLATE_REGISTRY.clear()
+        state["template"] = TEMPLATE_REGISTRY.get(tpl_bytes)
+
+    def move_body():
+        move_body_elements(state["ms_doc"], state["template"].new_document())
+
+    def build():
+        BODY_CACHE.clear()
+        state["output_size"] = len(build_auto_docx(state["template"], ms_bytes,
+                                                   state["sections"]).getbuffer())
+
+    def rebuild():
+        # Satu field bagian depan diedit: isi utama diambil dari BODY_CACHE
+        edited = dict(state["sections"], Afiliasi="Universitas Contoh")
+        build_auto_docx(state["template"], ms_bytes, edited)
+
+    return [("parse", parse), ("detect", detect), ("template", template),
+            ("move_body", move_body), ("build", build), ("rebuild", rebuild)], state
+
+
+def run_scenario(params, repeat):
+    ms_bytes = generate_manuscript(**params)
+    tpl_bytes = generate_template()
+    result = {"input_size": len(ms_bytes), "stages": {}}
+
+    # Waktu: tanpa tracemalloc (overhead-nya besar), ambil yang terbaik dari `repeat`
+    for _ in range(repeat):
+        steps, state = stages(ms_bytes, tpl_bytes)
+        for name, step in steps:
+            started = time.perf_counter()
+            step()
+            elapsed = time.perf_counter() - started
+            entry = result["stages"].setdefault(name, {"seconds": elapsed})
+            entry["seconds"] = min(entry["seconds"], elapsed)
+    result["output_size"] = state["output_size"]
+
+    # Memori puncak: satu lintasan terpisah dengan tracemalloc
+    steps, _ = stages(ms_bytes, tpl_bytes)
+    tracemalloc.start()
+    try:
+        for name, step in steps:
+            tracemalloc.reset_peak()
+            step()
+            result["stages"][name]["peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Daftar regresi (skenario, tahap, metrik, baseline, sekarang) melebihi `tolerance`."""
+    regressions = []
+    for scenario, result in results.items():
+        base_stages = baseline.get(scenario, {}).get("stages", {})
+        for stage, metrics in result["stages"].items():
+            for metric, value in metrics.items():
+                base = base_stages.get(stage, {}).get(metric)
+                if metric == "seconds" and value - (base or 0) < MIN_SECONDS_DELTA:
+                    continue
+                if base and value > base * (1 + tolerance):
+                    regressions.append((scenario, stage, metric, base, value))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline formatter per tahap.")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Simpan hasil sebagai baseline baru")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Batas kenaikan relatif sebelum dianggap regresi (default 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for scenario in args.scenario:
+        results[scenario] = result = run_scenario(SCENARIOS[scenario], args.repeat)
+        print(f"[{scenario}] input {result['input_size'] // 1024} KB -> output {result['output_size'] // 1024} KB")
+        for stage, metrics in result["stages"].items():
+            print(f"  {stage:<10} {metrics['seconds'] * 1000:9.1f} ms  {metrics['peak_kb']:>9} KB")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline disimpan ke {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Belum ada baseline ({args.baseline}); jalankan dengan --save-baseline.")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for scenario, stage, metric, base, value in regressions:
+        print(f"REGRESI [{scenario}] {stage}.{metric}: {base:.4g} -> {value:.4g}", file=sys.stderr)
+    if not regressions:
+        print("Tidak ada regresi terhadap baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# Generator naskah .docx sintetis yang deterministik (seed yang sama = bytes yang sama),
+# untuk benchmark pipeline formatter tanpa perlu naskah asli.
+import io
+import random
+import struct
+import zipfile
+import zlib
+
+from docx import Document
+from docx.shared import Inches
+
+from formatter import REQUIRED_STYLES
+
+FRONT_MATTER = {
+    "id": {
+        "abstract": "Abstrak",
+        "keywords": "Kata Kunci",
+        "chapters": ["PENDAHULUAN", "METODE PENELITIAN", "HASIL DAN PEMBAHASAN", "KESIMPULAN"],
+    },
+    "en": {
+        "abstract": "Abstract",
+        "keywords": "Keywords",
+        "chapters": ["INTRODUCTION", "RESEARCH METHOD", "RESULTS AND DISCUSSION", "CONCLUSION"],
+    },
+}
+
+WORDS = (
+    "penelitian data analisis hasil metode model sistem informasi pengujian nilai "
+    "variabel sampel responden pengaruh signifikan the of and results method analysis "
+    "study performance evaluation proposed approach significant"
+).split()
+
+# Tanggal tetap untuk setiap entri zip agar output deterministik
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def make_png(width, height, rnd):
+    """PNG RGB berisi noise (tidak bisa dikompresi, mirip ukuran foto/figur asli)."""
+    row_bytes = width * 3
+    raw = b"".join(b"\x00" + rnd.randbytes(row_bytes) for _ in range(height))
+
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b""))
+
+
+def _sentence(rnd, words):
+    text = " ".join(rnd.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _deterministic_bytes(doc):
+    """Simpan dokumen lalu tulis ulang zip-nya dengan timestamp tetap."""
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    out = io.BytesIO()
+    with zipfile.ZipFile(buffer) as zin, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            zout.writestr(zipfile.ZipInfo(info.filename, ZIP_DATE_TIME), zin.read(info.filename),
+                          compress_type=zipfile.ZIP_DEFLATED)
+    return out.getvalue()
+
+
+def generate_template():
+    """Template jurnal minimal yang memuat semua style di REQUIRED_STYLES."""
+    doc = Document()
+    for name, style_type in REQUIRED_STYLES:
+        doc.styles.add_style(name, style_type)
+    doc.add_paragraph("Isi template ini akan dibuang oleh builder.")
+    return _deterministic_bytes(doc)
+
+
+def generate_manuscript(paragraphs=200, heading_depth=2, tables=5, table_rows=10, table_cols=4,
+                        images=5, image_size=256, languages=("id", "en"), seed=0):
+    """
+    Naskah sintetis: front matter (judul, penulis, afiliasi, email, abstrak & kata kunci
+    untuk setiap bahasa di `languages`), lalu 4 bab bernomor dengan sub-bab sampai
+    kedalaman `heading_depth` (2 -> 2.1, 3 -> 3.2.1), `paragraphs` paragraf isi,
+    `tables` tabel `table_rows` x `table_cols`, dan `images` gambar PNG
+    `image_size` x `image_size` piksel. Bahasa bab mengikuti languages[0].
+    """
+    rnd = random.Random(seed)
+    doc = Document()
+
+    # --- Front matter ---
+    doc.add_paragraph(_sentence(rnd, 10).rstrip(".").upper())
+    doc.add_paragraph("Ani Lestari1, Budi Santoso2*")
+    doc.add_paragraph("1Program Studi Informatika, Universitas Contoh, Jakarta")
+    doc.add_paragraph("2Program Studi Sistem Informasi, Universitas Contoh, Bandung")
+    doc.add_paragraph("Email: ani@contoh.ac.id, budi@contoh.ac.id")
+    doc.add_paragraph("*Corresponding author: budi@contoh.ac.id")
+    for lang in languages:
+        labels = FRONT_MATTER[lang]
+        doc.add_paragraph(f"{labels['abstract']}: {_sentence(rnd, 40)}")
+        doc.add_paragraph(_sentence(rnd, 40))
+        doc.add_paragraph(f"{labels['keywords']}: " + ", ".join(rnd.sample(WORDS, 4)))
+
+    # --- Isi: paragraf, tabel, dan gambar disebar merata di 4 bab ---
+    chapters = FRONT_MATTER[languages[0]]["chapters"]
+    blocks = ["p"] * paragraphs + ["t"] * tables + ["i"] * images
+    rnd.shuffle(blocks)
+    per_chapter = max(1, len(blocks) // len(chapters))
+    table_no = image_no = 0
+
+    for c, chapter in enumerate(chapters, start=1):
+        doc.add_paragraph(f"{c}. {chapter}")
+        chunk = blocks[(c - 1) * per_chapter:] if c == len(chapters) else blocks[(c - 1) * per_chapter:c * per_chapter]
+        numbering = [c]
+        for i, kind in enumerate(chunk):
+            # Sub-bab baru setiap 10 blok, kedalaman bergantian sampai heading_depth
+            if heading_depth >= 2 and i % 10 == 0:
+                depth = 2 + (i // 10) % (heading_depth - 1)
+                numbering = (numbering + [0] * depth)[:depth]
+                numbering[-1] += 1
+                doc.add_paragraph(".".join(map(str, numbering)) + " " + _sentence(rnd, 4).rstrip("."))
+
+            if kind == "p":
+                p = doc.add_paragraph(_sentence(rnd, 60) + " ")
+                run = p.add_run(_sentence(rnd, 8))
+                if rnd.random() < 0.2:
+                    run.font.highlight_color = 7
+            elif kind == "t":
+                table_no += 1
+                doc.add_paragraph(f"Tabel {table_no}. {_sentence(rnd, 5)}")
+                table = doc.add_table(rows=table_rows, cols=table_cols)
+                for row in table.rows:
+                    for cell in row.cells:
+                        cell.text = f"{rnd.random():.3f}"
+            else:
+                image_no += 1
+                doc.add_picture(io.BytesIO(make_png(image_size, image_size, rnd)), width=Inches(3))
+                doc.add_paragraph(f"Gambar {image_no}. {_sentence(rnd, 5)}")
+
+    doc.add_paragraph("DAFTAR PUSTAKA")
+    for _ in range(10):
+        doc.add_paragraph(_sentence(rnd, 15))
+    return _deterministic_bytes(doc)
@@ -0,0 +1,250 @@
+# Klien layanan formatter (service.py). Hanya memakai pustaka standar, jadi
+# proses pemanggil (sistem submission, skrip, UI Streamlit) tidak perlu memuat
+# python-docx/lxml atau mem-parse template: semuanya sudah hangat di layanan.
+#
+# Contoh:
+#   python client.py template.docx naskah.docx -o hasil.docx
+#   python client.py template.docx naskah.docx -o hasil.docx --service unix:///tmp/formatter.sock
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import urllib.parse
+
+# Alamat layanan bila tidak diberikan: http://host:port atau unix:///path/socket
+SERVICE_URL_ENV = "FORMATTER_SERVICE_URL"
+DEFAULT_SERVICE_URL = "http://127.0.0.1:8765"
+DEFAULT_TIMEOUT = 60.0
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Status job (bagian dari protokol layanan; jobs.BuildJob memakai nilai yang sama)
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+
+class ServiceError(Exception):
+    """Permintaan ke layanan gagal; `status` = kode HTTP."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServiceClient:
+    """
+    Klien HTTP untuk layanan formatter. `url` berupa http://host:port atau
+    unix:///path/socket (bawaan: env FORMATTER_SERVICE_URL). Setiap panggilan
+    memakai koneksi sendiri, jadi satu klien aman dipakai bersama banyak thread.
+    """
+
+    def __init__(self, url=None, timeout=DEFAULT_TIMEOUT):
+        self.url = url or os.environ.get(SERVICE_URL_ENV) or DEFAULT_SERVICE_URL
+        self.timeout = timeout
+        parsed = urllib.parse.urlsplit(self.url)
+        if parsed.scheme == "unix":
+            self._socket_path = parsed.path
+            self._host = None
+        elif parsed.scheme == "http":
+            self._socket_path = None
+            self._host = parsed.netloc
+        else:
+            raise ValueError(f"Alamat layanan tidak dikenal: {self.url} (http://host:port atau unix:///path)")
+
+    def _connection(self, timeout):
+        if self._socket_path is not None:
+            return _UnixHTTPConnection(self._socket_path, timeout)
+        return http.client.HTTPConnection(self._host, timeout=timeout)
+
+    def _request(self, method, path, params=None, body=None, headers=None, wait=None):
+        if params:
+            query = {k: v for k, v in params.items() if v is not None}
+            if query:
+                path = f"{path}?{urllib.parse.urlencode(query)}"
+        # Permintaan yang menunggu job selesai boleh lebih lama dari timeout biasa
+        conn = self._connection(self.timeout + (wait or 0))
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            if response.status >= 400:
+                data = response.read()
+                try:
+                    message = json.loads(data)["error"]
+                except (ValueError, KeyError, TypeError):
+                    message = data.decode("utf-8", "replace") or response.reason
+                raise ServiceError(response.status, message)
+            return conn, response
+        except BaseException:
+            conn.close()
+            raise
+
+    def _json(self, method, path, payload=None, params=None, wait=None):
+        body = None
+        headers = {}
+        if payload is not None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        conn, response = self._request(method, path, params, body, headers, wait)
+        try:
+            data = response.read()
+        finally:
+            conn.close()
+        return json.loads(data) if data else None
+
+    def health(self):
+        return self._json("GET", "/health")
+
+    def rules(self):
+        """Nama rule pack yang tersedia di layanan."""
+        return self._json("GET", "/rules")["rules"]
+
+    def options(self):
+        """
+        Pilihan untuk UI: {"rules": [...], "styles": {bagian: style}, "images": {"dpi",
+        "quality", "available"}}, agar klien tidak perlu mengimpor modul formatter.
+        """
+        return self._json("GET", "/options")
+
+    def upload(self, source, session=None, role=None):
+        """
+        Kirim file .docx (path, bytes, atau objek file seperti UploadedFile) ke store
+        layanan. Return {"id", "size"}; `id` = hash SHA-256 isinya. Dengan
+        role="template" template langsung di-parse di worker (plus "missing_styles").
+        """
+        headers = {"Content-Type": DOCX_MIME}
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                headers["Content-Length"] = str(os.fstat(f.fileno()).st_size)
+                return self._upload(f, headers, session, role)
+        if isinstance(source, (bytes, bytearray)):
+            return self._upload(source, headers, session, role)
+        if hasattr(source, "getbuffer"):
+            # BytesIO/UploadedFile: dikirim langsung dari buffer-nya, tanpa salinan bytes
+            with source.getbuffer() as view:
+                return self._upload(view, headers, session, role)
+        pos = source.tell()
+        source.seek(0)
+        try:
+            return self._upload(source.read(), headers, session, role)
+        finally:
+            source.seek(pos)
+
+    def _upload(self, body, headers, session, role):
+        conn, response = self._request("POST", "/files", {"session": session, "role": role}, body, headers)
+        try:
+            return json.loads(response.read())
+        finally:
+            conn.close()
+
+    def has_file(self, file_id, session=None):
+        """True bila file masih ada di store layanan (file & sesinya ditandai baru dipakai)."""
+        try:
+            conn, _ = self._request("HEAD", f"/files/{file_id}", {"session": session})
+        except ServiceError as e:
+            if e.status == 404:
+                return False
+            raise
+        conn.close()
+        return True
+
+    def template(self, file_id, rules=None):
+        """
+        Info template yang sudah diunggah: {"id", "missing_styles"}. Dengan `rules`
+        style yang dipakai rule pack itu ikut dicek.
+        """
+        return self._json("GET", f"/templates/{file_id}", params={"rules": rules})
+
+    def detect(self, manuscript_id, rules=None, metrics=False, profile=False):
+        """Deteksi bagian depan naskah: {"sections", "metrics"}."""
+        return self._json("POST", "/detect", {"manuscript": manuscript_id, "rules": rules,
+                                              "metrics": metrics, "profile": profile})
+
+    def submit(self, template_id, manuscript_id, data=None, rules=None, optimize_images=None,
+               metrics=False, profile=False, wait=None):
+        """
+        Kirim build dan kembalikan info job. Tanpa `data` bagian depan dideteksi
+        otomatis di layanan (hasilnya di "sections"). Dengan `wait` (detik)
+        layanan baru menjawab setelah job selesai atau waktu tunggu habis.
+        """
+        payload = {"template": template_id, "manuscript": manuscript_id, "data": data, "rules": rules,
+                   "optimize_images": optimize_images, "metrics": metrics, "profile": profile}
+        return self._json("POST", "/jobs", payload, {"wait": wait}, wait)
+
+    def job(self, job_id, wait=None):
+        """Info job (status, progress, error, images, fidelity, metrics), atau None bila tidak dikenal."""
+        try:
+            return self._json("GET", f"/jobs/{job_id}", params={"wait": wait}, wait=wait)
+        except ServiceError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def cancel(self, job_id):
+        return self._json("DELETE", f"/jobs/{job_id}")
+
+    def download(self, job_id, path=None):
+        """Isi hasil build (bytes), atau ditulis ke `path` per potongan bila diberikan."""
+        conn, response = self._request("GET", f"/jobs/{job_id}/result")
+        try:
+            if path is None:
+                return response.read()
+            with open(path, "wb") as f:
+                for chunk in iter(lambda: response.read(COPY_CHUNK_SIZE), b""):
+                    f.write(chunk)
+            return path
+        finally:
+            conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Format satu naskah lewat layanan formatter yang sedang berjalan.")
+    parser.add_argument("template", help="Template jurnal (.docx)")
+    parser.add_argument("manuscript", help="Naskah mentah (.docx)")
+    parser.add_argument("-o", "--output", required=True, help="File hasil (.docx)")
+    parser.add_argument("--service", default=None,
+                        help=f"Alamat layanan (bawaan: ${SERVICE_URL_ENV} atau {DEFAULT_SERVICE_URL})")
+    parser.add_argument("--rules", default=None, help="Nama rule pack di layanan")
+    parser.add_argument("--optimize-images", action="store_true", help="Perkecil & kompres gambar")
+    parser.add_argument("--timeout", type=float, default=300, help="Batas waktu tunggu build (detik)")
+    args = parser.parse_args(argv)
+
+    client = ServiceClient(args.service)
+    try:
+        template_id = client.upload(args.template, role="template")["id"]
+        manuscript_id = client.upload(args.manuscript)["id"]
+        job = client.submit(template_id, manuscript_id, rules=args.rules,
+                            optimize_images=args.optimize_images or None, wait=args.timeout)
+        if job["status"] != JOB_DONE:
+            print(f"Build {job['status']}: {job.get('error') or 'belum selesai'}", file=sys.stderr)
+            return 1
+        client.download(job["id"], args.output)
+    except (OSError, ServiceError) as e:
+        print(f"GAGAL: {e}", file=sys.stderr)
+        return 1
+
+    fidelity = job.get("fidelity")
+    if fidelity is not None and not fidelity["ok"]:
+        print(f"PERINGATAN: {len(fidelity['differences'])} perbedaan isi antara naskah dan hasil",
+              file=sys.stderr)
+    print(f"OK: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+# Verifikasi struktur hasil build: isi naskah (mulai Bab 1) dibandingkan dengan
+# isi dokumen hasil tanpa membuka Word. Kedua document.xml dibaca streaming sekali
+# jalan; per bagian (judul bab/sub-bab menurut rule pack) dibandingkan digest
+# teks, jumlah & isi sel tabel, serta hash isi gambar. Hasilnya laporan JSON.
+import difflib
+import hashlib
+import io
+import os
+import posixpath
+import zipfile
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.parser import element_class_lookup
+from lxml import etree
+
+from formatter import (PARAGRAPH_SCAN_XPATH, PKG_RELS_NS, W_BODY, W_NS, W_P, W_TBL,
+                       get_rule_pack, main_document_name, read_source_bytes, scan_element, timed)
+
+W_TC = f"{{{W_NS}}}tc"
+
+# Potongan teks paragraf yang ikut di laporan saat isi berbeda
+PREVIEW_CHARS = 80
+
+# Mode perbandingan gambar: "hash" = isi byte harus sama; "count" = cukup jumlahnya
+# (dipakai bila gambar dioptimasi sehingga byte-nya memang berubah)
+IMAGES_HASH = "hash"
+IMAGES_COUNT = "count"
+
+
+class SectionDigest:
+    """Ringkasan satu bagian isi: judul, digest teks paragraf, tabel, dan gambar."""
+
+    __slots__ = ("heading", "paragraphs", "_text", "tables", "images")
+
+    def __init__(self, heading):
+        self.heading = heading
+        self.paragraphs = []  # (hash pendek teks, potongan teks) per paragraf bertekst
+        self._text = hashlib.sha256()
+        self.tables = []      # {"cells": n, "text_sha256": ...} per tabel
+        self.images = []      # hash isi gambar per rujukan, urut kemunculan
+
+    def add_text(self, text):
+        text = " ".join(text.split())
+        data = text.encode("utf-8")
+        self._text.update(data + b"\n")
+        self.paragraphs.append((hashlib.sha1(data).hexdigest()[:16], text[:PREVIEW_CHARS]))
+
+    @property
+    def text_sha256(self):
+        return self._text.hexdigest()
+
+    def as_dict(self):
+        return {"heading": self.heading, "paragraphs": len(self.paragraphs), "text_sha256": self.text_sha256,
+                "tables": self.tables, "images": self.images}
+
+
+class DocumentDigest:
+    """Hasil scan_document: bagian-bagian isi beserta penghitung ringkas."""
+
+    def __init__(self):
+        self.sections = []
+        self.body_start_found = False
+        self.skipped_before_body = 0
+
+    def summary(self):
+        return {
+            "sections": len(self.sections),
+            "paragraphs": sum(len(s.paragraphs) for s in self.sections),
+            "tables": sum(len(s.tables) for s in self.sections),
+            "cells": sum(t["cells"] for s in self.sections for t in s.tables),
+            "images": sum(len(s.images) for s in self.sections),
+            "skipped_before_body": self.skipped_before_body,
+        }
+
+
+def _image_members(zipf, doc_name):
+    """rId gambar dokumen utama -> nama member zip-nya."""
+    base = posixpath.dirname(doc_name)
+    rels_name = posixpath.join(base, "_rels", posixpath.basename(doc_name) + ".rels")
+    try:
+        rels = etree.fromstring(zipf.read(rels_name))
+    except KeyError:
+        return {}
+    members = {}
+    for rel in rels.iterfind(f"{{{PKG_RELS_NS}}}Relationship"):
+        if rel.get("Type") != RT.IMAGE or rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target")
+        if target.startswith("/"):
+            members[rel.get("Id")] = target.lstrip("/")
+        else:
+            members[rel.get("Id")] = posixpath.normpath(posixpath.join(base, target))
+    return members
+
+
+def scan_document(source, rules=None, chunk_size=64 * 1024):
+    """
+    Baca document.xml `source` (path, bytes, atau file) secara streaming dan ringkas
+    isinya mulai paragraf awal isi (marker body_start rule pack), dengan aturan lewati
+    yang sama seperti move_body_elements. Elemen yang sudah diringkas dibuang, jadi
+    memori tidak bergantung pada panjang naskah (kecuali potongan teks per paragraf).
+    """
+    rules = get_rule_pack(rules)
+    if not isinstance(source, (str, os.PathLike)):
+        source = io.BytesIO(read_source_bytes(source))
+
+    digest = DocumentDigest()
+    section = None
+    image_hashes = {}  # member zip -> sha256 (gambar yang dirujuk berkali-kali di-hash sekali)
+
+    parser = etree.XMLPullParser(events=("end",), tag=(W_P, W_TBL))
+    parser.set_element_class_lookup(element_class_lookup)
+
+    with zipfile.ZipFile(source) as zipf:
+        doc_name = main_document_name(zipf)
+        images = _image_members(zipf, doc_name)
+
+        def image_hashes_for(rids):
+            found = []
+            for rId in rids:
+                member = images.get(rId)
+                if member is None:
+                    continue
+                if member not in image_hashes:
+                    try:
+                        image_hashes[member] = hashlib.sha256(zipf.read(member)).hexdigest()
+                    except KeyError:
+                        image_hashes[member] = None  # part gambar hilang dari paket
+                found.append(image_hashes[member])
+            return found
+
+        with zipf.open(doc_name) as stream:
+            while True:
+                chunk = stream.read(chunk_size)
+                if chunk:
+                    parser.feed(chunk)
+                for _, element in parser.read_events():
+                    parent = element.getparent()
+                    # Paragraf/tabel di dalam tabel atau textbox ikut elemen induknya
+                    if parent is None or parent.tag != W_BODY:
+                        continue
+
+                    if element.tag == W_P:
+                        text, rids, has_drawing = scan_element(element, PARAGRAPH_SCAN_XPATH)
+                        if text or has_drawing:
+                            if section is None and text and rules.is_body_start(text.upper()):
+                                digest.body_start_found = True
+                                section = SectionDigest(text)
+                                digest.sections.append(section)
+                            elif section is None:
+                                digest.skipped_before_body += 1
+                            elif text and rules.classify(text) != rules.default_style:
+                                section = SectionDigest(text)
+                                digest.sections.append(section)
+                            if section is not None:
+                                if text:
+                                    section.add_text(text)
+                                section.images.extend(image_hashes_for(rids))
+                    elif section is not None:
+                        text, rids, _ = scan_element(element, PARAGRAPH_SCAN_XPATH)
+                        section.tables.append({
+                            "cells": sum(1 for _ in element.iter(W_TC)),
+                            "text_sha256": hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest(),
+                        })
+                        section.images.extend(image_hashes_for(rids))
+
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del parent[0]
+                if not chunk:
+                    break
+            parser.close()
+    return digest
+
+
+def _compare_sections(src, out, images_mode, differences):
+    heading = src.heading
+    if src.text_sha256 != out.text_sha256:
+        diff = {"type": "text", "section": heading,
+                "source_paragraphs": len(src.paragraphs), "output_paragraphs": len(out.paragraphs)}
+        # Paragraf pertama yang berbeda (atau yang hilang di salah satu sisi)
+        for index in range(max(len(src.paragraphs), len(out.paragraphs))):
+            a = src.paragraphs[index] if index < len(src.paragraphs) else None
+            b = out.paragraphs[index] if index < len(out.paragraphs) else None
+            if a is None or b is None or a[0] != b[0]:
+                diff.update(paragraph=index, source_text=a and a[1], output_text=b and b[1])
+                break
+        differences.append(diff)
+
+    if len(src.tables) != len(out.tables):
+        differences.append({"type": "table_count", "section": heading,
+                            "source": len(src.tables), "output": len(out.tables)})
+    for index, (a, b) in enumerate(zip(src.tables, out.tables)):
+        if a["cells"] != b["cells"]:
+            differences.append({"type": "table_cells", "section": heading, "table": index,
+                                "source": a["cells"], "output": b["cells"]})
+        elif a["text_sha256"] != b["text_sha256"]:
+            differences.append({"type": "table_text", "section": heading, "table": index})
+
+    if images_mode == IMAGES_COUNT:
+        if len(src.images) != len(out.images):
+            differences.append({"type": "image_count", "section": heading,
+                                "source": len(src.images), "output": len(out.images)})
+    elif src.images != out.images:
+        missing = list(src.images)
+        extra = []
+        for h in out.images:
+            if h in missing:
+                missing.remove(h)
+            else:
+                extra.append(h)
+        differences.append({"type": "images", "section": heading, "missing": missing, "extra": extra,
+                            "reordered": not missing and not extra})
+
+
+def verify_output(source, output, rules=None, images=IMAGES_HASH):
+    """
+    Bandingkan isi naskah `source` dengan dokumen hasil `output` (keduanya path,
+    bytes, atau file). Bagian depan tidak dibandingkan (dirender ulang dari data
+    deteksi); yang dicek adalah isi mulai marker awal isi rule pack `rules`.
+
+    Return laporan (siap json.dump): {"ok", "source", "output", "differences"};
+    "differences" kosong bila teks, tabel, dan gambar setiap bagian sama.
+    """
+    rules = get_rule_pack(rules)
+    with timed("verify"):
+        src = scan_document(source, rules)
+        out = scan_document(output, rules)
+
+        differences = []
+        for side, digest in (("source", src), ("output", out)):
+            if not digest.body_start_found:
+                differences.append({"type": "body_start_missing", "side": side})
+
+        # Bagian dipasangkan menurut urutan judulnya; yang tidak punya pasangan = hilang/tambahan
+        matcher = difflib.SequenceMatcher(None, [s.heading for s in src.sections],
+                                          [s.heading for s in out.sections], autojunk=False)
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == "equal" or (op == "replace" and i2 - i1 == j2 - j1):
+                for a, b in zip(src.sections[i1:i2], out.sections[j1:j2]):
+                    if op == "replace":
+                        differences.append({"type": "heading", "source": a.heading, "output": b.heading})
+                    _compare_sections(a, b, images, differences)
+                continue
+            for section in src.sections[i1:i2]:
+                differences.append({"type": "section_missing", "section": section.heading,
+                                    "paragraphs": len(section.paragraphs)})
+            for section in out.sections[j1:j2]:
+                differences.append({"type": "section_extra", "section": section.heading,
+                                    "paragraphs": len(section.paragraphs)})
+
+    return {"ok": not differences, "source": src.summary(), "output": out.summary(),
+            "differences": differences}
@@ -0,0 +1,1727 @@
+# Inti pipeline formatter: deteksi bagian, cloning isi, dan builder .docx.
+# Tidak bergantung pada Streamlit agar bisa dipakai dari app.py maupun batch.py.
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.document import Document as DocxDocument
+import cProfile
+import contextvars
+import io
+import json
+import logging
+import mmap
+import os
+import re
+import hashlib
+import threading
+import time
+import uuid
+import weakref
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from copy import deepcopy
+from docx.oxml.ns import qn
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.opc.part import Part
+from docx.opc.pkgwriter import PackageWriter
+from docx.oxml.parser import element_class_lookup
+from docx.parts.image import ImagePart
+from lxml import etree
+import posixpath
+
+from images import image_options, optimize_document_images
+
+# Namespace OOXML yang dipakai saat memindahkan gambar & relasi
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+
+# --- KONFIGURASI NAMA STYLE (SESUAIKAN DENGAN TEMPLATE ANDA) ---
+STYLE_SUBJUDUL_UTAMA = "Subjudul_Jurnal"  # Untuk Bab 1, 2, 4
+STYLE_HASIL_PEMBAHASAN = "Sub_Judul"      # Khusus Bab 3
+STYLE_SUBSUB = "Subsubjudul_Jurnal"       # Untuk 2.1, 3.1, dst
+STYLE_ISI = "Isi_Jurnal"                  # Paragraf teks & isi tabel
+STYLE_TABEL = "Tabel_Jurnal"              # Style tabel
+STYLE_TABEL_FALLBACK = "Table Grid"
+
+# Pemetaan Style Otomatis bagian depan naskah
+STYLE_MAPPING = {
+    "Judul": "Judul_Jurnal",
+    "Author": "Author_Jurnal",
+    "Afiliasi": "Afiliasi_Jurnal",
+    "Email": "Afiliasi_Jurnal",
+    "Email Korespondensi": "Afiliasi_Jurnal",
+    "Abstrak": "Abstrak_Jurnal",
+    "Kata Kunci": "Abstrak_Jurnal",
+    "Abstract (EN)": "Abstrak_Jurnal",
+    "Keywords (EN)": "Abstrak_Jurnal"
+}
+
+# Rule pack bawaan: marker awal isi & klasifikasi judul bab di isi naskah.
+# Jurnal lain cukup menambah file JSON berformat sama di folder rules/.
+DEFAULT_RULE_PACK = {
+    "name": "default",
+    # Isi utama dimulai dari paragraf yang memuat salah satu marker ini
+    "body_start": ["1. PENDAHULUAN", "1. INTRODUCTION"],
+    # Dicek berurutan; aturan pertama yang cocok menentukan style paragraf
+    "rules": [
+        # Judul Bab 3 (Hasil & Pembahasan)
+        {"style": STYLE_HASIL_PEMBAHASAN,
+         "markers": ["3. HASIL DAN PEMBAHASAN", "3. RESULTS AND DISCUSSION",
+                     "3. HASIL PENELITIAN DAN PEMBAHASAN", "3. HASIL"]},
+        # Judul Bab 2 atau Bab 4 (Metodologi / Kesimpulan)
+        {"style": STYLE_SUBJUDUL_UTAMA,
+         "markers": ["2. METODOLOGI PENELITIAN", "2. RESEARCH METHODOLOGY", "2. METODE PENELITIAN",
+                     "2. RESEARCH METHOD", "4. KESIMPULAN", "4. CONCLUSION", "4. PENUTUP",
+                     "KESIMPULAN DAN SARAN"]},
+        # Sub-bab (Contoh: 3.1 Analisis Data)
+        {"style": STYLE_SUBSUB, "pattern": r"\d+\.\d+", "max_length": 150},
+    ],
+    # Paragraf isi standar
+    "default_style": STYLE_ISI,
+}
+
+# Semua style yang wajib ada di template, beserta jenisnya
+REQUIRED_STYLES = [
+    (name, WD_STYLE_TYPE.PARAGRAPH)
+    for name in dict.fromkeys(list(STYLE_MAPPING.values()) + [
+        STYLE_SUBJUDUL_UTAMA, STYLE_HASIL_PEMBAHASAN, STYLE_SUBSUB, STYLE_ISI,
+    ])
+] + [(STYLE_TABEL, WD_STYLE_TYPE.TABLE)]
+
+# --- INSTRUMENTASI (OPSIONAL) ---
+# Aktif hanya di dalam `with instrument(...)`; di luar itu setiap titik ukur
+# cukup satu ContextVar.get() yang mengembalikan None.
+metrics_logger = logging.getLogger("formatter.metrics")
+
+
+def enable_metrics_log(*loggers):
+    """
+    Kirim baris JSON metrik job (plus `loggers` lain, mis. log permintaan layanan)
+    ke stderr. Handler dipasang sekali per proses, jadi aman dipanggil berulang.
+    """
+    for log in (metrics_logger, *loggers):
+        if not log.handlers:
+            log.addHandler(logging.StreamHandler())
+            log.setLevel(logging.INFO)
+
+
+_CURRENT_METRICS = contextvars.ContextVar("formatter_metrics", default=None)
+
+
+class JobMetrics:
+    """Waktu per tahap (detik, diakumulasi) dan penghitung untuk satu job."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.timings = {}
+        self.counters = {}
+        self.profile_path = None
+
+    def add_time(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_dict(self):
+        return {
+            "job_id": self.job_id,
+            "timings": {k: round(v, 6) for k, v in self.timings.items()},
+            "counters": dict(self.counters),
+            "profile": self.profile_path,
+        }
+
+
+def current_metrics():
+    """JobMetrics untuk job yang sedang diinstrumentasi, atau None."""
+    return _CURRENT_METRICS.get()
+
+
+@contextmanager
+def timed(stage):
+    """Catat lama blok `with` sebagai `stage` bila instrumentasi aktif."""
+    metrics = _CURRENT_METRICS.get()
+    if metrics is None:
+        yield None
+        return
+    started = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.add_time(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def instrument(job_id=None, profile_path=None):
+    """
+    Aktifkan instrumentasi untuk satu job. Saat selesai, hasilnya dikirim ke
+    logger 'formatter.metrics' sebagai satu baris JSON. Bila `profile_path`
+    diisi, job juga diprofil dengan cProfile dan hasilnya di-dump ke sana.
+    """
+    metrics = JobMetrics(job_id or uuid.uuid4().hex[:12])
+    token = _CURRENT_METRICS.set(metrics)
+    profiler = cProfile.Profile() if profile_path else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            metrics.profile_path = profile_path
+        _CURRENT_METRICS.reset(token)
+        metrics_logger.info(json.dumps({"event": "formatter.job", **metrics.as_dict()}))
+
+
+# --- 0. CACHE DOKUMEN (PARSE SEKALI, PAKAI ULANG) ---
+def read_source_bytes(source):
+    """
+    Ambil isi biner dari path, bytes, atau objek file (termasuk UploadedFile Streamlit)
+    tanpa menggeser posisi baca objek file tersebut.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+
+    pos = source.tell()
+    source.seek(0)
+    data = source.read()
+    source.seek(pos)
+    return data
+
+
+def source_key(source):
+    """
+    Hash SHA-256 isi `source`. File di disk di-hash lewat mmap, tanpa menyalin
+    isinya ke memori proses.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return hashlib.sha256(b"").hexdigest()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return hashlib.sha256(mapped).hexdigest()
+    return hashlib.sha256(read_source_bytes(source)).hexdigest()
+
+
+def open_source(source):
+    """
+    Parse paket .docx. Path dibuka langsung (zip dibaca per part dari file),
+    sumber lain lewat salinan bytes di memori.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return Document(source)
+    return Document(io.BytesIO(read_source_bytes(source)))
+
+
+# Pohon lxml hasil parse berukuran ~2-3.5x XML tak terkompresinya (diukur pada
+# naskah sintetis benchmarks/); media disimpan apa adanya
+XML_RESIDENT_FACTOR = 3
+
+
+def parsed_size(source):
+    """
+    Perkiraan memori (byte) paket .docx `source` setelah di-parse, dari ukuran
+    part tak terkompresi di direktori zip (tanpa mengekstrak isinya):
+    XML x XML_RESIDENT_FACTOR + ukuran part lain (gambar dst.).
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        source = io.BytesIO(read_source_bytes(source))
+    size = 0
+    with zipfile.ZipFile(source) as zipf:
+        for info in zipf.infolist():
+            if info.filename.endswith((".xml", ".rels")):
+                size += info.file_size * XML_RESIDENT_FACTOR
+            else:
+                size += info.file_size
+    return size
+
+
+class DocumentCache:
+    """
+    Cache LRU untuk dokumen hasil parse, dikunci dengan hash SHA-256 isi file.
+    Dibatasi jumlah entri dan perkiraan memori hasil parse (parsed_size); entri
+    paling lama tidak dipakai dibuang lebih dulu. Batasnya berlaku per proses.
+
+    Dokumen dari get() dipakai bersama (hanya untuk dibaca).
+    """
+
+    def __init__(self, max_entries=16, max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # hash -> (Document, perkiraan memori)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, source, key=None):
+        """`key` = hash SHA-256 isi `source` bila pemanggil sudah menghitungnya."""
+        if not isinstance(source, (str, os.PathLike)):
+            source = read_source_bytes(source)
+        if key is None:
+            key = source_key(source)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        # Parse di luar lock agar thread lain tidak ikut menunggu
+        doc = open_source(source)
+        size = parsed_size(source)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+            self._entries[key] = (doc, size)
+            self._total_bytes += size
+            self._evict()
+        return doc
+
+    def discard(self, key):
+        """Buang entri `key` (mis. naskah yang isinya sudah ada di BODY_CACHE)."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _evict(self):
+        # Sisakan minimal satu entri (yang baru saja dimasukkan)
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+
+
+DOCUMENT_CACHE = DocumentCache()
+
+
+def load_document(source):
+    """Dokumen hasil parse (dipakai bersama, jangan diubah). Menerima Document, path, bytes, atau file."""
+    if isinstance(source, DocxDocument):
+        return source
+    return DOCUMENT_CACHE.get(source)
+
+
+def check_template_styles(doc):
+    """
+    Cocokkan REQUIRED_STYLES dengan style di template.
+    Return (style_ids, missing): peta nama -> style_id untuk style yang ada,
+    dan daftar nama style yang tidak ada (atau jenisnya salah).
+    """
+    style_ids = {}
+    missing = []
+    for name, style_type in REQUIRED_STYLES:
+        try:
+            style = doc.styles[name]
+        except KeyError:
+            missing.append(name)
+            continue
+        if style.type != style_type:
+            missing.append(name)
+            continue
+        style_ids[name] = style.style_id
+    return style_ids, missing
+
+
+class JournalTemplate:
+    """
+    Template jurnal yang sudah dikosongkan dan divalidasi.
+    Kerangka disimpan sebagai bytes paket .docx; new_document() memberi
+    salinan baru yang siap diisi tanpa perlu mengosongkan template lagi.
+    `paragraph_styles` = nama semua style paragraf di template.
+    """
+
+    def __init__(self, key, skeleton, style_ids, missing_styles, paragraph_styles=frozenset()):
+        self.key = key
+        self.skeleton = skeleton
+        self.style_ids = style_ids
+        self.missing_styles = missing_styles
+        self.paragraph_styles = paragraph_styles
+
+    def new_document(self):
+        return Document(io.BytesIO(self.skeleton))
+
+    def missing_styles_for(self, rules=None):
+        """missing_styles ditambah style rule pack `rules` yang tidak ada di template."""
+        if rules is None:
+            return self.missing_styles
+        extra = [name for name in dict.fromkeys([*rules.styles, rules.default_style])
+                 if name not in self.paragraph_styles and name not in self.missing_styles]
+        return self.missing_styles + extra
+
+
+def strip_template(doc):
+    """Buang semua paragraf & tabel di body template (sectPr, header, footer tetap)."""
+    for p in doc.paragraphs: p._element.getparent().remove(p._element)
+    for t in doc.tables: t._element.getparent().remove(t._element)
+
+
+class TemplateRegistry:
+    """
+    Registry LRU template jurnal, dikunci dengan hash SHA-256 isi file template.
+    Template di-parse, dikosongkan, dan dicek style-nya sekali saja.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # hash -> JournalTemplate
+        self._lock = threading.Lock()
+
+    def get(self, source):
+        if isinstance(source, JournalTemplate):
+            return source
+        if isinstance(source, DocxDocument):
+            buffer = io.BytesIO()
+            source.save(buffer)
+            source = buffer.getvalue()
+        elif not isinstance(source, (str, os.PathLike)):
+            source = read_source_bytes(source)
+        key = source_key(source)
+
+        with self._lock:
+            template = self._entries.get(key)
+            if template is not None:
+                self._entries.move_to_end(key)
+                return template
+
+        doc = open_source(source)
+        strip_template(doc)
+        style_ids, missing = check_template_styles(doc)
+        paragraph_styles = frozenset(s.name for s in doc.styles if s.type == WD_STYLE_TYPE.PARAGRAPH)
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        template = JournalTemplate(key, buffer.getvalue(), style_ids, missing, paragraph_styles)
+
+        with self._lock:
+            self._entries.setdefault(key, template)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+TEMPLATE_REGISTRY = TemplateRegistry()
+
+
+class BodyCache:
+    """
+    Cache LRU isi naskah yang sudah dirakit & di-style di atas kerangka template
+    (tanpa bagian depan), dikunci (hash template, hash naskah, rule pack). Isi ini tidak
+    bergantung pada data_map, jadi build ulang setelah bagian depan diedit cukup
+    menyalin dokumen dari sini lalu merender bagian depannya saja.
+
+    Entri berupa (Document, indeks elemen body pertama hasil naskah, info tambahan
+    mis. ringkasan optimasi gambar); dokumennya dipakai bersama, jadi selalu
+    disalin (clone_document) sebelum diubah. Ukuran entri = perkiraan memori (parsed_size naskah).
+    """
+
+    def __init__(self, max_entries=8, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (Document, indeks awal isi, info, perkiraan memori)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[:3]
+
+    def put(self, key, doc, body_start, size, info=None):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[3]
+            self._entries[key] = (doc, body_start, info or {}, size)
+            self._total_bytes += size
+            # Sisakan minimal satu entri (yang baru saja dimasukkan)
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+            ):
+                _, (_, _, _, evicted) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+BODY_CACHE = BodyCache()
+
+# --- RULE PACK PER JURNAL ---
+# Folder rule pack tambahan (<nama>.json, format sama dengan DEFAULT_RULE_PACK)
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules")
+
+
+def marker_pattern(markers):
+    """
+    Regex "mengandung salah satu marker" dalam bentuk trie: awalan yang sama
+    digabung, jadi biaya per posisi teks bergantung pada panjang marker, bukan
+    jumlahnya. Marker yang diawali marker lain cukup diwakili yang terpendek.
+    """
+    trie = {}
+    for marker in markers:
+        node = trie
+        for ch in marker.upper():
+            if node.get("") is True:
+                break
+            node = node.setdefault(ch, {})
+        else:
+            node.clear()
+            node[""] = True
+
+    def build(node):
+        if node.get("") is True:
+            return ""
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie) if trie else None
+
+
+class RulePack:
+    """
+    Aturan satu jurnal yang sudah dikompilasi. Setiap aturan berisi "style" dan
+    "markers" (substring, tanpa beda huruf besar/kecil) dan/atau "pattern" (regex
+    di awal paragraf), opsional "max_length" (panjang paragraf maksimum untuk
+    pattern, eksklusif). Urutan aturan = prioritas.
+
+    Semua marker dari semua aturan digabung menjadi satu trie regex: paragraf isi
+    biasa (mayoritas) ditolak dengan satu kali pencarian, berapa pun jumlah
+    markernya. Hanya paragraf yang memuat marker dicek per aturan untuk prioritas.
+    """
+
+    def __init__(self, spec, key=None):
+        self.spec = spec
+        self.name = spec.get("name", "tanpa_nama")
+        self.key = key or rule_pack_key(spec)
+        self.default_style = spec.get("default_style", STYLE_ISI)
+        self.styles = []
+        self.marker_rules = []   # (indeks aturan, regex marker aturan itu)
+
+        all_markers = []
+        pattern_branches = []
+        for index, rule in enumerate(spec.get("rules", [])):
+            markers = marker_pattern(rule.get("markers", []))
+            if not rule.get("style") or not (markers or rule.get("pattern")):
+                raise ValueError(f"Rule pack '{self.name}': aturan #{index + 1} butuh style dan markers/pattern")
+            if markers:
+                all_markers += rule["markers"]
+                self.marker_rules.append((index, re.compile(markers)))
+            if rule.get("pattern"):
+                length = f"(?=.{{0,{rule['max_length'] - 1}}}\\Z)" if rule.get("max_length") else ""
+                pattern_branches.append(f"{length}(?:{rule['pattern']})(?P<r{index}>)")
+            self.styles.append(rule["style"])
+
+        # Marker dicocokkan ke teks huruf besar, tanpa re.IGNORECASE (jauh lebih cepat)
+        self.any_marker_re = re.compile(marker_pattern(all_markers)) if all_markers else None
+        self.pattern_re = None
+        if pattern_branches:
+            self.pattern_re = re.compile("^(?:" + "|".join(pattern_branches) + ")", re.DOTALL)
+
+        body = marker_pattern(spec.get("body_start", []))
+        if not body:
+            raise ValueError(f"Rule pack '{self.name}': body_start tidak boleh kosong")
+        self.body_start_re = re.compile(body)
+        self.front_marker_re = compile_front_marker_re(body)
+
+    def is_body_start(self, text_upper):
+        """`text_upper` = teks paragraf dalam huruf besar."""
+        return self.body_start_re.search(text_upper) is not None
+
+    def classify(self, text, text_upper=None):
+        """Nama style untuk paragraf isi dengan teks `text` (sudah di-strip)."""
+        best = len(self.styles)
+        if self.pattern_re is not None:
+            match = self.pattern_re.match(text)
+            if match is not None:
+                best = int(match.lastgroup[1:])
+        if self.any_marker_re is not None:
+            if text_upper is None:
+                text_upper = text.upper()
+            if self.any_marker_re.search(text_upper):
+                for index, marker_re in self.marker_rules:
+                    if index >= best:
+                        break
+                    if marker_re.search(text_upper):
+                        best = index
+                        break
+        return self.styles[best] if best < len(self.styles) else self.default_style
+
+    def style_ids(self, doc):
+        """Peta nama style pack -> style_id di `doc`."""
+        return {name: paragraph_style_id(doc, name) for name in {*self.styles, self.default_style}}
+
+
+_RULE_PACKS = {}  # key -> RulePack yang sudah dikompilasi
+
+
+def rule_pack_key(spec):
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def available_rule_packs():
+    """Nama rule pack yang bisa dipilih: bawaan + file JSON di RULES_DIR."""
+    names = [DEFAULT_RULE_PACK["name"]]
+    if os.path.isdir(RULES_DIR):
+        names += sorted(os.path.splitext(f)[0] for f in os.listdir(RULES_DIR) if f.endswith(".json"))
+    return list(dict.fromkeys(names))
+
+
+def get_rule_pack(source=None):
+    """
+    RulePack dari None (bawaan), RulePack, dict spesifikasi, nama pack di
+    RULES_DIR, atau path file JSON. Hasil kompilasi di-cache per isi pack.
+    """
+    if isinstance(source, RulePack):
+        return source
+    if source is None or source == DEFAULT_RULE_PACK["name"]:
+        spec = DEFAULT_RULE_PACK
+    elif isinstance(source, dict):
+        spec = source
+    else:
+        path = source
+        if not os.path.exists(path):
+            path = os.path.join(RULES_DIR, f"{source}.json")
+        if not os.path.exists(path):
+            raise ValueError(f"Rule pack '{source}' tidak ditemukan")
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+
+    key = rule_pack_key(spec)
+    pack = _RULE_PACKS.get(key)
+    if pack is None:
+        pack = _RULE_PACKS.setdefault(key, RulePack(spec, key))
+    return pack
+
+
+# --- 1. LOGIKA DETEKSI OTOMATIS (HEURISTIC) ---
+def compile_front_marker_re(body_pattern):
+    """
+    Semua marker bagian depan naskah dikompilasi menjadi satu matcher. Urutan
+    alternatif = prioritas (sama seperti urutan if/elif versi lama), sehingga
+    cukup satu kali match per paragraf dan nama grup yang cocok = jenis baris.
+    `body_pattern` = regex marker awal isi utama dari rule pack.
+    """
+    return re.compile(
+        r"^(?:"
+        rf"(?=.*?{body_pattern})(?P<body>)"
+        r"|(?P<abstrak>ABSTRAK)"
+        r"|(?P<abstract>ABSTRACT)"
+        r"|(?=.*?KATA KUNCI)(?P<kata_kunci>)"
+        r"|(?=.*?KEYWORDS)(?P<keywords>)"
+        r"|(?=.*?@)(?P<email>)"
+        r"|(?=.*?PENDAHULUAN)(?P<pendahuluan>)"
+        r")",
+        re.IGNORECASE | re.DOTALL,
+    )
+
+
+EMAIL_RE = re.compile(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+')
+CORRESPONDING_RE = re.compile(r"CORRESPONDING|KORESPONDENSI|\*", re.IGNORECASE)
+
+# State mesin deteksi
+STATE_FRONT = 0        # Judul -> Author -> Afiliasi/Email (afiliasi masih dikumpulkan)
+STATE_ABSTRAK = 1      # Di dalam Abstrak (Indonesia)
+STATE_ABSTRACT = 2     # Di dalam Abstract (English)
+STATE_AFTER = 3        # Sesudah abstrak: hanya Kata Kunci/Keywords/Email yang dicari
+
+# Jenis baris yang menutup abstrak yang sedang terbuka. Versi lama menutup Abstrak
+# hanya di Kata Kunci dan Abstract hanya di Keywords/Pendahuluan; tanpa baris itu
+# abstrak menelan abstrak bahasa lain (atau sisa naskah), jadi judul abstrak
+# lain dan kata kunci bahasa mana pun juga menutupnya.
+ABSTRAK_END_KINDS = ("body", "abstract", "kata_kunci", "keywords")
+ABSTRACT_END_KINDS = ("body", "abstrak", "kata_kunci", "keywords", "pendahuluan")
+
+
+def _format_keywords(text, marker, label):
+    val = text.split(":", 1)[-1].strip() if ":" in text else text.replace(marker, "").strip()
+    # Bersihkan tanda baca dan ganti koma ke titik koma
+    val = val.replace(",", ";")
+    keywords_cleaned = "; ".join([k.strip() for k in val.split(";") if k.strip()])
+    return f"{label}: {keywords_cleaned}"
+
+
+def _detect_email(sections, text):
+    emails = EMAIL_RE.findall(text)
+    if emails:
+        if CORRESPONDING_RE.search(text):
+            sections["Email Korespondensi"] = f"Email Penulis Korespondensi: {emails[0]}"
+        elif not sections["Email"]:
+            sections["Email"] = f"Email: {', '.join(emails)}"
+
+
+W_BODY = f"{{{W_NS}}}body"
+W_P = f"{{{W_NS}}}p"
+OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+PKG_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def main_document_name(zipf):
+    """Nama part dokumen utama di zip (biasanya word/document.xml), dari _rels/.rels."""
+    try:
+        rels = etree.fromstring(zipf.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in rels.iterfind(f"{{{PKG_RELS_NS}}}Relationship"):
+        if rel.get("Type") == OFFICE_DOCUMENT_REL:
+            return rel.get("Target").lstrip("/")
+    return "word/document.xml"
+
+
+def iter_paragraph_texts(source, chunk_size=64 * 1024):
+    """
+    Teks paragraf tingkat body (sama dengan Document.paragraphs) yang dibaca
+    bertahap langsung dari document.xml di dalam zip, tanpa memuat paket docx.
+    Elemen yang sudah lewat dibuang, jadi memori tetap kecil; berhenti membaca
+    begitu pemanggil berhenti mengambil (generator ditutup).
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        source = io.BytesIO(read_source_bytes(source))
+
+    # Kelas elemen python-docx, agar CT_P.text persis sama dengan Paragraph.text
+    parser = etree.XMLPullParser(events=("end",), tag=W_P)
+    parser.set_element_class_lookup(element_class_lookup)
+
+    with zipfile.ZipFile(source) as zipf, zipf.open(main_document_name(zipf)) as stream:
+        while True:
+            chunk = stream.read(chunk_size)
+            if chunk:
+                parser.feed(chunk)
+            for _, element in parser.read_events():
+                parent = element.getparent()
+                # Paragraf di dalam tabel/textbox tidak termasuk Document.paragraphs
+                if parent is None or parent.tag != W_BODY:
+                    continue
+                yield element.text
+                element.clear()
+                while element.getprevious() is not None:
+                    del parent[0]
+            if not chunk:
+                break
+        parser.close()
+
+
+def auto_detect_sections(ms_doc, rules=None):
+    """
+    Mendeteksi bagian naskah secara otomatis dalam satu lintasan (state machine):
+    Judul -> Author -> Afiliasi -> Email -> Abstrak/Abstract -> Kata Kunci/Keywords,
+    lalu berhenti begitu Bab 1 (Pendahuluan/Introduction) ditemukan.
+    1. Stop-logic pada Afiliasi agar tidak bocor ke Pendahuluan.
+    2. Konversi tanda koma (,) ke titik koma (;) pada Kata Kunci.
+    3. Pemeliharaan label formal untuk Email dan Abstrak.
+
+    `ms_doc` berupa path, bytes, atau file dibaca secara streaming
+    (iter_paragraph_texts), sehingga lamanya bergantung pada panjang bagian
+    depan, bukan panjang naskah. Objek Document dibaca dari paragrafnya.
+    Marker awal isi utama diambil dari rule pack `rules`.
+    """
+    sections = {
+        "Judul": "", "Author": "", "Afiliasi": "", "Email": "",
+        "Email Korespondensi": "", 
+        "Abstrak": "", "Kata Kunci": "", "Abstract (EN)": "", "Keywords (EN)": ""
+    }
+
+    metrics = current_metrics()
+    started = time.perf_counter()
+    front_marker_re = get_rule_pack(rules).front_marker_re
+
+    # Teks paragraf diambil secara lazy: paragraf setelah Bab 1 tidak pernah dibaca
+    if isinstance(ms_doc, DocxDocument):
+        # Sama dengan Document.paragraphs, tapi tanpa membuat daftar semua paragraf dulu
+        texts = (p.text for p in ms_doc.element.body.iterchildren(W_P))
+    else:
+        texts = iter_paragraph_texts(ms_doc)
+    paragraphs = (text for text in (t.strip() for t in texts) if text)
+
+    state = STATE_FRONT
+    afiliasi_list = []
+    content_buffer = []
+    index = -1
+
+    for index, text in enumerate(paragraphs):
+        # 1. Judul & Author (Posisi baris 1 & 2)
+        if index == 0:
+            sections["Judul"] = text
+            continue
+        if index == 1:
+            sections["Author"] = text
+            continue
+
+        match = front_marker_re.match(text)
+        kind = match.lastgroup if match else None
+
+        # --- A. DI DALAM ABSTRAK: kumpulkan isi sampai ada marker penutup ---
+        # (baris email di dalam abstrak tetap ikut dicatat, seperti versi lama)
+        if state == STATE_ABSTRAK:
+            if kind not in ABSTRAK_END_KINDS:
+                content_buffer.append(text)
+                if kind == "email":
+                    _detect_email(sections, text)
+                continue
+            sections["Abstrak"] = f"Abstrak{' '.join(content_buffer)}"
+            state = STATE_AFTER
+        elif state == STATE_ABSTRACT:
+            if kind not in ABSTRACT_END_KINDS:
+                content_buffer.append(text)
+                if kind == "email":
+                    _detect_email(sections, text)
+                continue
+            sections["Abstract (EN)"] = f"Abstract{' '.join(content_buffer)}"
+            state = STATE_AFTER
+
+        # --- B. AWAL ISI UTAMA: deteksi selesai ---
+        if kind == "body":
+            break
+
+        # --- C. MARKER ABSTRAK (juga mengunci pengumpulan Afiliasi) ---
+        if kind == "abstrak":
+            state = STATE_AFTER
+            if not sections["Abstrak"]:
+                # Ambil teks setelah kata 'Abstrak' di baris yang sama
+                first_line = text[7:].strip(" :-").strip()
+                content_buffer = [first_line] if first_line else []
+                state = STATE_ABSTRAK
+
+        elif kind == "abstract":
+            state = STATE_AFTER
+            if not sections["Abstract (EN)"]:
+                first_line = text[8:].strip(" :-").strip()
+                content_buffer = [first_line] if first_line else []
+                state = STATE_ABSTRACT
+
+        # --- D. KATA KUNCI & KEYWORDS (Standardisasi Titik Koma) ---
+        elif kind == "kata_kunci":
+            sections["Kata Kunci"] = _format_keywords(text, "KATA KUNCI", "Kata Kunci")
+
+        elif kind == "keywords":
+            sections["Keywords (EN)"] = _format_keywords(text, "KEYWORDS", "Keywords")
+
+        # --- E. EMAIL ---
+        elif kind == "email":
+            _detect_email(sections, text)
+
+        # --- F. AFILIASI (hanya sebelum gerbang Abstrak terbuka) ---
+        elif state == STATE_FRONT and len(text) > 3:
+            afiliasi_list.append(text)
+
+    # Sisa document.xml tidak perlu dibaca lagi
+    texts.close()
+
+    # Abstrak yang belum ditutup marker apa pun berakhir di awal isi/dokumen
+    if state == STATE_ABSTRAK:
+        sections["Abstrak"] = f"Abstrak{' '.join(content_buffer)}"
+    elif state == STATE_ABSTRACT:
+        sections["Abstract (EN)"] = f"Abstract{' '.join(content_buffer)}"
+
+    # Gabungkan semua baris afiliasi dengan baris baru (\n)
+    sections["Afiliasi"] = "\n".join(afiliasi_list)
+
+    if metrics is not None:
+        metrics.add_time("detect", time.perf_counter() - started)
+        metrics.count("detect_paragraphs", index + 1)
+    
+    return sections
+
+# --- 2. FUNGSI CLONING & STYLING ---
+def apply_style_to_element(element, style_name):
+    """
+    Suntik style dan bersihkan format 'sampah' (highlight, shading, color)
+    agar benar-benar mengikuti template.
+    """
+    metrics = _CURRENT_METRICS.get()
+    started = time.perf_counter() if metrics is not None else 0.0
+
+    # 1. Terapkan Style Paragraf
+    pPr = element.get_or_add_pPr()
+    pStyle = pPr.find(qn('w:pStyle'))
+    if pStyle is None:
+        pStyle = pPr.makeelement(qn('w:pStyle'))
+        pPr.insert(0, pStyle)
+    pStyle.set(qn('w:val'), style_name)
+
+    # 2. Bersihkan Shading/Highlight di level Paragraf
+    shd_p = pPr.find(qn('w:shd'))
+    if shd_p is not None:
+        pPr.remove(shd_p)
+
+    # 3. Iterasi ke setiap Run (teks) untuk membersihkan highlight & shading
+    for run in element.findall(qn('w:r')):
+        rPr = run.get_or_add_rPr()
+        
+        # Hapus Highlight (warna stabilo)
+        highlight = rPr.find(qn('w:highlight'))
+        if highlight is not None:
+            rPr.remove(highlight)
+            
+        # Hapus Shading (warna latar belakang/bayangan teks)
+        shading = rPr.find(qn('w:shd'))
+        if shading is not None:
+            rPr.remove(shading)
+
+        # Hapus Warna Teks (agar kembali otomatis mengikuti style template)
+        color = rPr.find(qn('w:color'))
+        if color is not None:
+            rPr.remove(color)
+
+    if metrics is not None:
+        metrics.add_time("styling", time.perf_counter() - started)
+        metrics.count("styled_paragraphs")
+
+
+# Format langsung yang dibuang dari isi naskah: shading paragraf, serta
+# highlight/shading/warna pada run. Satu XPath terkompilasi untuk satu subtree.
+DIRECT_FORMAT_XPATH = etree.XPath(
+    "descendant-or-self::w:pPr/w:shd"
+    " | descendant-or-self::w:rPr/w:highlight"
+    " | descendant-or-self::w:rPr/w:shd"
+    " | descendant-or-self::w:rPr/w:color",
+    namespaces={"w": W_NS},
+)
+
+
+def apply_styles_bulk(style_map, roots):
+    """
+    Versi massal apply_style_to_element untuk isi yang sudah dirakit:
+    set w:pStyle dari peta {paragraf: nama style}, lalu hapus highlight, shading,
+    dan color di semua `roots` sekaligus. Run yang tidak punya format tersebut
+    tidak disentuh (tidak dibuatkan rPr kosong).
+    """
+    metrics = _CURRENT_METRICS.get()
+    started = time.perf_counter() if metrics is not None else 0.0
+
+    for p, style_name in style_map.items():
+        pPr = p.get_or_add_pPr()
+        pStyle = pPr.find(qn('w:pStyle'))
+        if pStyle is None:
+            pStyle = pPr.makeelement(qn('w:pStyle'))
+            pPr.insert(0, pStyle)
+        pStyle.set(qn('w:val'), style_name)
+
+    for root in roots:
+        for node in DIRECT_FORMAT_XPATH(root):
+            node.getparent().remove(node)
+
+    if metrics is not None:
+        metrics.add_time("styling", time.perf_counter() - started)
+        metrics.count("styled_paragraphs", len(style_map))
+
+
+# Paragraf langsung di sel baris tabel ini, sama dengan row.cells -> cell.paragraphs
+# python-docx: tabel bersarang & text box tidak ikut, dan sel lanjutan merge vertikal
+# (w:vMerge tanpa val="restart") dilewati karena python-docx menunjuk ke sel di atasnya
+TABLE_CELL_PARAGRAPHS_XPATH = etree.XPath(
+    "w:tr/w:tc[not(w:tcPr/w:vMerge) or w:tcPr/w:vMerge/@w:val = 'restart']/w:p",
+    namespaces={"w": W_NS})
+
+
+def paragraph_style_id(doc, name):
+    """style_id untuk style paragraf `name`, atau `name` itu sendiri bila tidak ada."""
+    try:
+        return doc.styles[name].style_id
+    except KeyError:
+        return name
+
+
+def resolve_table_style_id(target_doc, style_names=(STYLE_TABEL, STYLE_TABEL_FALLBACK)):
+    """style_id tabel pertama dari `style_names` yang ada di dokumen target, atau None."""
+    for name in style_names:
+        try:
+            return target_doc.part.get_style_id(name, WD_STYLE_TYPE.TABLE)
+        except (KeyError, ValueError):
+            continue
+    return None
+
+
+def content_key(part):
+    """Kunci isi part untuk deduplikasi: (content type, SHA-256 blob)."""
+    return part.content_type, hashlib.sha256(part.blob).hexdigest()
+
+
+class PartTransfer:
+    """
+    Memindahkan part yang dirujuk elemen hasil deepcopy (gambar, chart, hyperlink, dst.)
+    dari paket naskah ke paket target secara langsung.
+
+    Atribut r:embed / r:id / r:link di dalam XML disalin apa adanya lalu dipetakan ulang
+    ke rId baru di target, sehingga geometri gambar (inline maupun anchor/floating) tetap
+    seperti aslinya. Blob tidak disalin atau di-hash ulang: part baru memakai objek bytes
+    yang sama, dan hanya part yang benar-benar dirujuk yang ikut dipindahkan.
+
+    `shared` (dict, opsional) adalah penyimpanan part berbasis isi yang dipakai bersama
+    oleh beberapa transfer ke paket target yang sama (mis. saat merakit edisi): gambar
+    dan part tanpa relasi yang isinya sudah ada di target dirujuk ulang, tidak disalin.
+    """
+
+    _R_ATTRS = etree.XPath("descendant-or-self::*/@r:*", namespaces={"r": R_NS})
+    _DOC_PR = etree.XPath("descendant-or-self::wp:docPr", namespaces={"wp": WP_NS})
+
+    def __init__(self, source_part, target_part, shared=None):
+        self.source_part = source_part
+        self.target_part = target_part
+        self._package = target_part.package
+        self._shared = shared  # (content type, hash isi) -> part di target
+        self._copied = {}  # part sumber -> part baru di target
+        self._rid_map = {}  # rId sumber -> rId target
+        self._partnames = {part.partname for part in self._package.iter_parts()}
+        self._next_shape_id = None
+
+    def remap(self, element):
+        """Petakan ulang semua rujukan relasi di dalam `element` (sudah di-deepcopy)."""
+        for value in self._R_ATTRS(element):
+            node = value.getparent()
+            new_rid = self._transfer_rel(str(value))
+            if new_rid is not None:
+                node.set(value.attrname, new_rid)
+
+        # id wp:docPr harus unik di dalam dokumen target
+        for doc_pr in self._DOC_PR(element):
+            if self._next_shape_id is None:
+                self._next_shape_id = self.target_part.next_id
+            doc_pr.set("id", str(self._next_shape_id))
+            self._next_shape_id += 1
+        return element
+
+    def _transfer_rel(self, rId):
+        if rId in self._rid_map:
+            return self._rid_map[rId]
+        rel = self.source_part.rels.get(rId)
+        if rel is None:
+            return None
+        if rel.is_external:
+            new_rid = self.target_part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        else:
+            new_rid = self.target_part.relate_to(self._copy_part(rel.target_part), rel.reltype)
+        self._rid_map[rId] = new_rid
+        return new_rid
+
+    def _copy_part(self, part):
+        new_part = self._copied.get(part)
+        if new_part is not None:
+            return new_part
+
+        key = None
+        if self._shared is not None and (isinstance(part, ImagePart) or not part.rels):
+            key = content_key(part)
+            new_part = self._shared.get(key)
+            if new_part is not None:
+                self._copied[part] = new_part
+                metrics = _CURRENT_METRICS.get()
+                if metrics is not None:
+                    metrics.count("parts_deduplicated")
+                return new_part
+
+        partname = self._next_partname(part.partname)
+        if isinstance(part, ImagePart):
+            new_part = ImagePart(partname, part.content_type, part.blob)
+            self._package.image_parts.append(new_part)
+            metrics = _CURRENT_METRICS.get()
+            if metrics is not None:
+                metrics.count("images_moved")
+                metrics.count("image_bytes_moved", len(part.blob))
+        else:
+            # Part lain (chart, SmartArt, OLE) disalin sebagai blob beserta relasinya
+            new_part = Part(partname, part.content_type, part.blob, self._package)
+        self._copied[part] = new_part
+        if key is not None:
+            self._shared[key] = new_part
+
+        for rel in part.rels.values():
+            target = rel.target_ref if rel.is_external else self._copy_part(rel.target_part)
+            new_part.rels.add_relationship(rel.reltype, target, rel.rId, rel.is_external)
+        return new_part
+
+    def _next_partname(self, partname):
+        # /word/media/image3.png -> /word/media/image%d.png
+        base, ext = posixpath.splitext(partname)
+        template = base.rstrip("0123456789") + "%d" + ext
+        n = 1
+        while PackURI(template % n) in self._partnames:
+            n += 1
+        new_partname = PackURI(template % n)
+        self._partnames.add(new_partname)
+        return new_partname
+
+
+# --- INDEKS ELEMEN BODY (SATU LINTASAN) ---
+KIND_PARAGRAPH = 0
+KIND_TABLE = 1
+KIND_SECTPR = 2
+KIND_OTHER = 3
+
+W_TBL = f"{{{W_NS}}}tbl"
+W_SECTPR = f"{{{W_NS}}}sectPr"
+WP_INLINE = f"{{{WP_NS}}}inline"
+WP_ANCHOR = f"{{{WP_NS}}}anchor"
+
+# Satu kali jalan per paragraf: node teks (tag berakhiran 't', sama seperti versi
+# lama: w:t, m:t, w:instrText, ...), gambar inline/anchor, dan semua atribut r:*
+PARAGRAPH_SCAN_XPATH = etree.XPath(
+    "descendant::*[substring(local-name(), string-length(local-name())) = 't']"
+    " | descendant::wp:inline | descendant::wp:anchor | descendant-or-self::*/@r:*",
+    namespaces={"wp": WP_NS, "r": R_NS},
+)
+# Tabel: teks sel tidak dipakai, cukup gambar & relasi
+TABLE_SCAN_XPATH = etree.XPath(
+    "descendant::wp:inline | descendant::wp:anchor | descendant-or-self::*/@r:*",
+    namespaces={"wp": WP_NS, "r": R_NS},
+)
+
+
+class BodyItem:
+    """Satu elemen body naskah beserta hasil pemindaian yang dipakai ulang."""
+
+    __slots__ = ("element", "kind", "text", "text_upper", "rids", "has_drawing", "rows", "cols")
+
+    def __init__(self, element, kind, text="", rids=(), has_drawing=False, rows=0, cols=0):
+        self.element = element
+        self.kind = kind
+        self.text = text
+        self.text_upper = text.upper()
+        self.rids = rids
+        self.has_drawing = has_drawing
+        self.rows = rows
+        self.cols = cols
+
+    @property
+    def needs_remap(self):
+        """Ada rujukan relasi (r:*) atau wp:docPr yang harus dipetakan ulang saat disalin."""
+        return bool(self.rids) or self.has_drawing
+
+
+def scan_element(element, xpath):
+    """(teks ter-strip, rId r:* yang dirujuk, ada gambar inline/anchor) untuk satu elemen body."""
+    parts = []
+    rids = []
+    has_drawing = False
+    for node in xpath(element):
+        if isinstance(node, str):
+            rids.append(str(node))
+        elif node.tag == WP_INLINE or node.tag == WP_ANCHOR:
+            has_drawing = True
+        elif node.text is not None:
+            parts.append(node.text)
+    return "".join(parts).strip(), tuple(rids), has_drawing
+
+
+def build_body_index(body):
+    """Indeks semua anak langsung w:body dalam satu lintasan (lihat BodyItem)."""
+    items = []
+    for element in body.iterchildren():
+        tag = element.tag
+        if tag == W_P:
+            text, rids, has_drawing = scan_element(element, PARAGRAPH_SCAN_XPATH)
+            items.append(BodyItem(element, KIND_PARAGRAPH, text, rids, has_drawing))
+        elif tag == W_TBL:
+            _, rids, has_drawing = scan_element(element, TABLE_SCAN_XPATH)
+            grid = element.find(qn("w:tblGrid"))
+            items.append(BodyItem(element, KIND_TABLE, "", rids, has_drawing,
+                                  rows=len(element.findall(qn("w:tr"))),
+                                  cols=len(grid) if grid is not None else 0))
+        elif tag == W_SECTPR:
+            items.append(BodyItem(element, KIND_SECTPR))
+        else:
+            _, rids, has_drawing = scan_element(element, TABLE_SCAN_XPATH)
+            items.append(BodyItem(element, KIND_OTHER, "", rids, has_drawing))
+    return items
+
+
+# Indeks per dokumen sumber (dipakai bersama, hanya dibaca); hilang bersama dokumennya
+_BODY_INDEXES = weakref.WeakKeyDictionary()
+_BODY_INDEXES_LOCK = threading.Lock()
+
+
+def body_index(doc):
+    """Indeks body `doc`, dibangun sekali per dokumen (mis. dokumen dari DOCUMENT_CACHE)."""
+    root = doc.element
+    with _BODY_INDEXES_LOCK:
+        items = _BODY_INDEXES.get(root)
+    if items is None:
+        items = build_body_index(root.body)
+        with _BODY_INDEXES_LOCK:
+            items = _BODY_INDEXES.setdefault(root, items)
+    return items
+
+
+def move_body_elements(source_doc, target_doc, bulk_styling=True, table_fast_path=True, progress=None,
+                       rules=None):
+    """
+    Salin isi naskah mulai Bab 1 ke dokumen target dan terapkan style jurnal.
+    Awal isi dan style judul bab ditentukan rule pack `rules` (lihat get_rule_pack).
+    Dengan bulk_styling=True style diterapkan sekali di akhir (apply_styles_bulk);
+    False memakai jalur lama apply_style_to_element per paragraf (untuk benchmark).
+    table_fast_path=True menata tabel langsung di XML tanpa docx.table.Table.
+    progress(done, total), bila diisi, dipanggil untuk setiap elemen body naskah;
+    exception dari callback menghentikan proses (dipakai untuk pembatalan job).
+    """
+    from docx.table import Table
+    
+    metrics = current_metrics()
+    move_started = time.perf_counter()
+    source_doc = load_document(source_doc)
+    rules = get_rule_pack(rules)
+
+    # Status awal: pencarian dimulai dari Pendahuluan
+    start_found = False
+    target_body = target_doc.element.body
+
+    # Nama style -> style_id di template (w:pStyle merujuk id, bukan nama tampilan)
+    style_ids = rules.style_ids(target_doc)
+    style_isi = style_ids[rules.default_style]
+
+    # --- 1. PRA-PEMROSESAN: PEMINDAH PART GAMBAR ---
+    # Part gambar baru disalin saat benar-benar dirujuk elemen yang ikut dipindahkan
+    transfer = PartTransfer(source_doc.part, target_doc.part)
+    table_style_id = resolve_table_style_id(target_doc) if table_fast_path else None
+
+    # Peta klasifikasi paragraf -> style, diterapkan sekaligus setelah isi dirakit
+    style_map = {}
+    copied = []
+
+    # Elemen isi disisipkan sebelum sectPr template agar pengaturan halaman,
+    # header & footer tetap milik template
+    template_sectPr = target_body.find(qn('w:sectPr'))
+
+    def add_to_body(new_element):
+        if template_sectPr is None:
+            target_body.append(new_element)
+        else:
+            template_sectPr.addprevious(new_element)
+        copied.append(new_element)
+
+    def style(p, style_name):
+        if bulk_styling:
+            style_map[p] = style_name
+        else:
+            apply_style_to_element(p, style_name)
+
+    # --- 2. ITERASI SETIAP ELEMEN DI DALAM NASKAH ASLI ---
+    # Teks, gambar & rujukan relasi tiap elemen sudah dipindai sekali di indeks body
+    items = body_index(source_doc)
+    total = len(items)
+    for done, item in enumerate(items, 1):
+        if progress is not None:
+            progress(done, total)
+
+        # sectPr naskah (ukuran kertas, header/footer naskah) tidak ikut dipindahkan
+        if item.kind == KIND_SECTPR:
+            continue
+
+        element = item.element
+        is_paragraph = item.kind == KIND_PARAGRAPH
+        has_image = item.has_drawing
+
+        # Abaikan paragraf kosong yang tidak memiliki gambar
+        if is_paragraph and not item.text and not has_image:
+            continue
+
+        # TRIGGER MULAI: Hanya proses elemen SETELAH menemukan Pendahuluan
+        if not start_found and is_paragraph and rules.is_body_start(item.text_upper):
+            start_found = True
+
+        if not start_found:
+            if metrics is not None:
+                metrics.count("skipped_before_body")
+            continue
+
+        branch_started = time.perf_counter() if metrics is not None else 0.0
+
+        # Elemen tanpa rujukan relasi/gambar tidak perlu dipetakan ulang
+        new_element = deepcopy(element)
+        if item.needs_remap:
+            transfer.remap(new_element)
+
+        # --- JALUR A: PARAGRAF DENGAN GAMBAR (DIRECT PART TRANSFER) ---
+        if is_paragraph and has_image:
+            branch = "image"
+            # Paragraf disalin utuh (drawing inline/anchor + caption), lalu rId gambar
+            # dipetakan ulang ke part yang dipindahkan langsung ke paket target
+            style(new_element, style_isi)
+            add_to_body(new_element)
+
+        # --- JALUR B: TABEL ---
+        elif item.kind == KIND_TABLE:
+            branch = "table"
+            if metrics is not None:
+                metrics.count("table_cells", item.rows * item.cols)
+
+            if table_fast_path:
+                # Style & autofit langsung di w:tblPr, lalu paragraf setiap sel ditata
+                # tepat sekali (sel merge tidak diproses berulang)
+                new_element.tblPr.style = table_style_id
+                new_element.tblPr.autofit = True
+                for paragraph in TABLE_CELL_PARAGRAPHS_XPATH(new_element):
+                    style(paragraph, style_isi)
+            else:
+                new_table = Table(new_element, target_doc)
+
+                # Terapkan Style Tabel dari Template (Pastikan nama style sesuai di Word)
+                try:
+                    new_table.style = STYLE_TABEL
+                except:
+                    new_table.style = STYLE_TABEL_FALLBACK
+
+                new_table.autofit = True
+
+                # Format font di dalam setiap sel agar konsisten dengan Isi Jurnal
+                for row in new_table.rows:
+                    for cell in row.cells:
+                        for paragraph in cell.paragraphs:
+                            style(paragraph._element, style_isi)
+
+            add_to_body(new_element)
+
+        # --- JALUR C: TEKS BIASA (DEEPCOPY METHOD) ---
+        else:
+            branch = "text"
+            if is_paragraph:
+                # Judul bab / sub-bab / paragraf isi: satu kali match terhadap rule pack
+                style(new_element, style_ids[rules.classify(item.text, item.text_upper)])
+
+            add_to_body(new_element)
+
+        if metrics is not None:
+            metrics.add_time(f"move_body.{branch}", time.perf_counter() - branch_started)
+            metrics.count(f"{branch}_elements")
+
+    # --- 3. STYLING MASSAL ---
+    if bulk_styling:
+        apply_styles_bulk(style_map, copied)
+
+    if metrics is not None:
+        metrics.add_time("move_body", time.perf_counter() - move_started)
+
+# --- 3. FUNGSI BUILDER ---
+# Media yang sudah terkompresi: disimpan apa adanya (ZIP_STORED), tidak di-deflate ulang
+PRECOMPRESSED_EXTS = {"jpg", "jpeg", "png", "gif", "webp", "wdp", "mp4", "xlsx", "docx", "pptx"}
+
+
+class _ZipStreamWriter:
+    """PhysPkgWriter untuk PackageWriter python-docx dengan kompresi per part."""
+
+    def __init__(self, output):
+        self._zipf = zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, pack_uri, blob):
+        ext = pack_uri.ext.lower()
+        compress_type = zipfile.ZIP_STORED if ext in PRECOMPRESSED_EXTS else zipfile.ZIP_DEFLATED
+        self._zipf.writestr(pack_uri.membername, blob, compress_type=compress_type)
+
+    def close(self):
+        self._zipf.close()
+
+
+def clone_document(doc):
+    """
+    Salinan mandiri `doc`: seluruh paket (part, relasi, elemen XML) di-deepcopy, lalu
+    Document baru dibuat dari part utama salinannya. Objek Document sendiri tidak
+    disalin: cache lazy-nya (mis. _body setelah .paragraphs/add_paragraph) menyimpan
+    sub-elemen lxml yang oleh deepcopy disalin terpisah dari pohon dokumennya.
+    """
+    return deepcopy(doc.part.package).main_document_part.document
+
+
+def save_document(doc, output):
+    """
+    Tulis paket .docx ke `output` (path, file, atau stream yang tidak bisa di-seek)
+    tanpa menyalin seluruh dokumen ke memori lebih dulu.
+    """
+    package = doc.part.package
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+
+    writer = _ZipStreamWriter(output)
+    PackageWriter._write_content_types_stream(writer, parts)
+    PackageWriter._write_pkg_rels(writer, package.rels)
+    PackageWriter._write_parts(writer, parts)
+    writer.close()
+
+
+def render_front_matter(doc, style_ids, data_map, before=None):
+    """
+    Tambahkan paragraf bagian depan (Judul s.d. Keywords) dari `data_map` ke `doc`,
+    di akhir body atau, bila `before` diisi, tepat sebelum elemen body tersebut.
+    """
+    # Urutan output di dokumen
+    order = ["Judul", "Author", "Afiliasi", "Email", "Email Korespondensi", 
+             "Abstrak", "Kata Kunci", "Abstract (EN)", "Keywords (EN)"]
+
+    # Label yang harus di-BOLD (hanya kata kuncinya saja)
+    special_labels = {
+        "Abstrak": "Abstrak",
+        "Abstract (EN)": "Abstract",
+        "Kata Kunci": "Kata Kunci:",
+        "Keywords (EN)": "Keywords:"
+    }
+
+    for cat in order:
+        content = data_map.get(cat, "").strip()
+        if content:
+            # Ambil style_id dari mapping; None (style tidak ada di template) = 'Normal'
+            p = doc.add_paragraph()
+            if before is not None:
+                before.addprevious(p._p)
+            p._p.style = style_ids.get(STYLE_MAPPING.get(cat))
+            
+            # Logika Penebalan Parsial
+            if cat in special_labels:
+                label_to_bold = special_labels[cat]
+                if content.startswith(label_to_bold):
+                    run_label = p.add_run(label_to_bold)
+                    run_label.bold = True
+                    
+                    remaining_text = content[len(label_to_bold):]
+                    run_content = p.add_run(remaining_text)
+                    run_content.bold = None 
+                else:
+                    run = p.add_run(content)
+                    run.bold = None
+            else:
+                run = p.add_run(content)
+                run.bold = None
+
+            # Reset Font agar mengikuti settingan Style di Template (Font Name, Size, Color, etc.)
+            for run in p.runs:
+                run.font.name = None
+                run.font.size = None
+
+
+def build_auto_docx(template_file, manuscript_file, data_map, output=None, progress=None, rules=None,
+                    optimize_images=None, report=None):
+    """
+    Rakit naskah berformat jurnal. Hasil ditulis ke `output` (path, file, atau
+    stream) lalu dikembalikan; tanpa `output` hasilnya BytesIO.
+    `progress` dan rule pack `rules` diteruskan ke move_body_elements.
+
+    `optimize_images` (True atau dict opsi, lihat images.image_options) mengaktifkan
+    optimasi gambar isi; ringkasannya (byte dihemat dst.) ditulis ke `report["images"]`
+    bila `report` berupa dict.
+
+    Isi utama (Bab 1 dst.) di-cache per template/naskah/rule pack di BODY_CACHE;
+    build ulang dengan data_map lain hanya merender ulang bagian depan. Naskah
+    berupa objek Document tidak punya kunci isi, jadi selalu dirakit penuh.
+    """
+    metrics = current_metrics()
+    started = time.perf_counter()
+
+    # Kerangka template (sudah dikosongkan & dicek style-nya) dari registry
+    with timed("build.template"):
+        template = TEMPLATE_REGISTRY.get(template_file)
+
+    rules = get_rule_pack(rules)
+    image_opts = image_options(optimize_images)
+    body_key = ms_key = None
+    if not isinstance(manuscript_file, DocxDocument):
+        # Path dibaca langsung dari disk (hash lewat mmap); sumber lain dibaca sekali ke memori
+        if not isinstance(manuscript_file, (str, os.PathLike)):
+            manuscript_file = read_source_bytes(manuscript_file)
+        ms_key = source_key(manuscript_file)
+        body_key = (template.key, ms_key, rules.key, json.dumps(image_opts, sort_keys=True))
+    cached = BODY_CACHE.get(body_key) if body_key else None
+
+    if cached is None:
+        # 1. Isi Utama (Pendahuluan dst.) dirakit di atas kerangka template
+        with timed("build.parse"):
+            ms_doc = manuscript_file if ms_key is None else DOCUMENT_CACHE.get(manuscript_file, key=ms_key)
+        new_doc = template.new_document()
+        body_start = len(new_doc.element.body) - (new_doc.element.body.sectPr is not None)
+        move_body_elements(ms_doc, new_doc, progress=progress, rules=rules)
+        info = {}
+        if image_opts:
+            # Gambar diperkecil/dikompres sekali sebelum masuk cache, bukan di tiap build ulang
+            with timed("build.images"):
+                info["images"] = optimize_document_images(new_doc, **image_opts)
+            if metrics is not None:
+                metrics.count("images_optimized", info["images"]["optimized"])
+                metrics.count("image_bytes_saved", info["images"]["bytes_saved"])
+        if body_key:
+            BODY_CACHE.put(body_key, new_doc, body_start, parsed_size(manuscript_file), info)
+            # Isinya sudah dipindah ke dokumen di BODY_CACHE: naskah hasil parse tidak perlu disimpan
+            DOCUMENT_CACHE.discard(ms_key)
+            with timed("build.clone"):
+                new_doc = clone_document(new_doc)
+    else:
+        cached_doc, body_start, info = cached
+        with timed("build.clone"):
+            new_doc = clone_document(cached_doc)
+    if metrics is not None:
+        metrics.count("body_cache_hits" if cached is not None else "body_cache_misses")
+    if report is not None and "images" in info:
+        report["images"] = dict(info["images"])
+
+    # 2. Bagian depan naskah dari hasil deteksi/verifikasi, disisipkan sebelum isi
+    body = new_doc.element.body
+    first_body_element = body[body_start] if body_start < len(body) else None
+    if first_body_element is not None and first_body_element.tag == qn('w:sectPr'):
+        first_body_element = None
+    with timed("build.front_matter"):
+        render_front_matter(new_doc, template.style_ids, data_map, before=first_body_element)
+
+    if output is None:
+        output = io.BytesIO()
+    with timed("build.save"):
+        save_document(new_doc, output)
+
+    if metrics is not None:
+        metrics.add_time("build", time.perf_counter() - started)
+        if isinstance(output, (str, os.PathLike)):
+            metrics.count("output_bytes", os.path.getsize(output))
+        elif hasattr(output, "tell"):
+            metrics.count("output_bytes", output.tell())
+
+    if hasattr(output, "seek") and output.seekable():
+        output.seek(0)
+    return output
+
+
+# --- 5. PERAKITAN EDISI (GABUNG BANYAK NASKAH) ---
+# Rujukan style & numbering di dalam isi artikel
+STYLE_REFS_XPATH = etree.XPath(
+    "descendant-or-self::w:pStyle | descendant-or-self::w:rStyle | descendant-or-self::w:tblStyle",
+    namespaces={"w": W_NS},
+)
+NUM_ID_XPATH = etree.XPath("descendant-or-self::w:numPr/w:numId", namespaces={"w": W_NS})
+BOOKMARK_IDS_XPATH = etree.XPath(
+    "descendant-or-self::w:bookmarkStart/@w:id | descendant-or-self::w:bookmarkEnd/@w:id",
+    namespaces={"w": W_NS},
+)
+
+# Relasi dokumen utama yang part-nya boleh dipakai bersama antar artikel
+SHARED_PART_RELTYPES = {RT.IMAGE, RT.HEADER, RT.FOOTER}
+
+
+def _element_hash(element, drop_attrs=()):
+    """SHA-256 bentuk kanonik `element` tanpa atribut `drop_attrs` (mis. ID)."""
+    element = deepcopy(element)
+    for attr in drop_attrs:
+        element.attrib.pop(attr, None)
+    return hashlib.sha256(etree.tostring(element, method="c14n")).hexdigest()
+
+
+class StyleMerger:
+    """
+    Style yang dirujuk isi artikel tetapi belum ada di dokumen edisi disalin sekali
+    per styleId (beserta basedOn/next/link-nya). Style dengan ID yang sama dianggap
+    sama: semua artikel dirakit dari template yang sama, jadi definisi template dipakai.
+    """
+
+    def __init__(self, target_doc):
+        self._styles = target_doc.styles.element
+        self._ids = {s.get(qn("w:styleId")) for s in self._styles.iterchildren(qn("w:style"))}
+
+    def merge(self, source_doc, roots):
+        pending = [ref.get(qn("w:val")) for root in roots for ref in STYLE_REFS_XPATH(root)]
+        pending = [style_id for style_id in pending if style_id not in self._ids]
+        if not pending:
+            return 0
+        source = {s.get(qn("w:styleId")): s for s in source_doc.styles.element.iterchildren(qn("w:style"))}
+        added = 0
+        while pending:
+            style_id = pending.pop()
+            if style_id in self._ids or style_id not in source:
+                continue
+            style = deepcopy(source[style_id])
+            self._styles.append(style)
+            self._ids.add(style_id)
+            added += 1
+            for name in ("w:basedOn", "w:next", "w:link"):
+                ref = style.find(qn(name))
+                if ref is not None:
+                    pending.append(ref.get(qn("w:val")))
+        return added
+
+
+class NumberingMerger:
+    """
+    Definisi list (w:abstractNum) artikel disimpan sekali per isi di numbering.xml
+    edisi. Setiap list artikel mendapat w:num baru yang merujuk definisi bersama itu,
+    dengan startOverride per level agar penomorannya tidak bersambung dari artikel
+    sebelumnya.
+    """
+
+    def __init__(self, target_doc):
+        self._numbering = target_doc.part.numbering_part.element
+        self._abstract_ids = {}  # hash isi abstractNum -> abstractNumId di edisi
+        abstract_ids = [-1]
+        for abstract in self._numbering.iterchildren(qn("w:abstractNum")):
+            abstract_id = abstract.get(qn("w:abstractNumId"))
+            self._abstract_ids.setdefault(_element_hash(abstract, (qn("w:abstractNumId"),)), abstract_id)
+            abstract_ids.append(int(abstract_id))
+        self._next_abstract_id = max(abstract_ids) + 1
+        self._next_num_id = max([0] + [int(n.get(qn("w:numId")))
+                                       for n in self._numbering.iterchildren(qn("w:num"))]) + 1
+
+    def merge(self, source_doc, roots):
+        refs = [ref for root in roots for ref in NUM_ID_XPATH(root)]
+        if not refs:
+            return
+        try:
+            source = source_doc.part.part_related_by(RT.NUMBERING).element
+        except KeyError:
+            return
+        nums = {n.get(qn("w:numId")): n for n in source.iterchildren(qn("w:num"))}
+        abstracts = {a.get(qn("w:abstractNumId")): a for a in source.iterchildren(qn("w:abstractNum"))}
+
+        mapping = {}
+        for ref in refs:
+            num_id = ref.get(qn("w:val"))
+            if num_id not in mapping:
+                num = nums.get(num_id)
+                # numId 0 = tanpa penomoran; rujukan yang rusak dibiarkan apa adanya
+                mapping[num_id] = self._add_list(num, abstracts) if num is not None else None
+            if mapping[num_id] is not None:
+                ref.set(qn("w:val"), mapping[num_id])
+
+    def _add_list(self, num, abstracts):
+        abstract_ref = num.find(qn("w:abstractNumId"))
+        abstract = abstracts.get(abstract_ref.get(qn("w:val"))) if abstract_ref is not None else None
+        if abstract is None:
+            return None
+
+        digest = _element_hash(abstract, (qn("w:abstractNumId"),))
+        abstract_id = self._abstract_ids.get(digest)
+        if abstract_id is None:
+            abstract_id = str(self._next_abstract_id)
+            self._next_abstract_id += 1
+            abstract = deepcopy(abstract)
+            abstract.set(qn("w:abstractNumId"), abstract_id)
+            # Semua w:abstractNum harus mendahului w:num
+            first_num = self._numbering.find(qn("w:num"))
+            if first_num is not None:
+                first_num.addprevious(abstract)
+            else:
+                self._numbering.append(abstract)
+            self._abstract_ids[digest] = abstract_id
+
+        num_id = str(self._next_num_id)
+        self._next_num_id += 1
+        new_num = deepcopy(num)
+        new_num.set(qn("w:numId"), num_id)
+        new_num.find(qn("w:abstractNumId")).set(qn("w:val"), abstract_id)
+        overridden = {o.get(qn("w:ilvl")) for o in new_num.iterchildren(qn("w:lvlOverride"))}
+        for lvl in abstracts[abstract_ref.get(qn("w:val"))].iterchildren(qn("w:lvl")):
+            ilvl = lvl.get(qn("w:ilvl"))
+            if ilvl in overridden:
+                continue
+            start = lvl.find(qn("w:start"))
+            override = new_num.makeelement(qn("w:lvlOverride"), {qn("w:ilvl"): ilvl})
+            start_override = override.makeelement(
+                qn("w:startOverride"), {qn("w:val"): start.get(qn("w:val")) if start is not None else "0"})
+            override.append(start_override)
+            new_num.append(override)
+
+        cleanup = self._numbering.find(qn("w:numIdMacAtCleanup"))
+        if cleanup is not None:
+            cleanup.addprevious(new_num)
+        else:
+            self._numbering.append(new_num)
+        return num_id
+
+
+def section_break_paragraph(sectPr):
+    """Paragraf kosong pembawa salinan `sectPr` (pemisah section, halaman baru)."""
+    p = sectPr.makeelement(qn("w:p"))
+    pPr = p.makeelement(qn("w:pPr"))
+    p.append(pPr)
+    pPr.append(deepcopy(sectPr))
+    return p
+
+
+def assemble_issue(template_file, articles, output=None, progress=None):
+    """
+    Gabungkan naskah yang sudah diformat (hasil build_auto_docx dengan template yang
+    sama; path, bytes, atau file) menjadi satu dokumen edisi, berurutan sesuai
+    `articles`. Setiap artikel dipisah section break (halaman baru) dengan pengaturan
+    section template.
+
+    Artikel dibaca satu per satu lalu dibuang; style & definisi list hanya ditambahkan
+    bila belum ada, dan gambar/part yang isinya identik disimpan sekali. `progress`
+    dipanggil sebagai progress(artikel_selesai, total). Hasil ditulis ke `output`
+    seperti di build_auto_docx.
+    """
+    metrics = current_metrics()
+    started = time.perf_counter()
+
+    with timed("issue.template"):
+        template = TEMPLATE_REGISTRY.get(template_file)
+    issue = template.new_document()
+    body = issue.element.body
+    final_sectPr = body.get_or_add_sectPr()
+
+    # Part template (logo, header/footer) ikut menjadi isi awal penyimpanan bersama
+    shared = {}
+    for rel in issue.part.rels.values():
+        if not rel.is_external and rel.reltype in SHARED_PART_RELTYPES and not rel.target_part.rels:
+            shared.setdefault(content_key(rel.target_part), rel.target_part)
+    styles = StyleMerger(issue)
+    numbering = NumberingMerger(issue)
+    bookmark_offset = 0
+
+    total = len(articles)
+    for i, source in enumerate(articles):
+        # Tidak lewat DOCUMENT_CACHE: setiap artikel hanya dibaca sekali
+        with timed("issue.parse"):
+            article = open_source(source)
+        with timed("issue.merge"):
+            elements = [el for el in article.element.body.iterchildren() if el.tag != W_SECTPR]
+            styles.merge(article, elements)
+            numbering.merge(article, elements)
+
+            # ID bookmark harus unik di seluruh dokumen edisi
+            bookmark_ids = [value for el in elements for value in BOOKMARK_IDS_XPATH(el)]
+            if bookmark_ids:
+                for value in bookmark_ids:
+                    value.getparent().set(value.attrname, str(int(value) + bookmark_offset))
+                bookmark_offset += max(int(value) for value in bookmark_ids) + 1
+
+            # Elemen dipindahkan (bukan disalin): dokumen artikel dibuang setelah ini
+            transfer = PartTransfer(article.part, issue.part, shared=shared)
+            for element in elements:
+                transfer.remap(element)
+                final_sectPr.addprevious(element)
+            if i < total - 1:
+                final_sectPr.addprevious(section_break_paragraph(final_sectPr))
+        del article, elements, transfer
+
+        if metrics is not None:
+            metrics.count("articles")
+        if progress is not None:
+            progress(i + 1, total)
+
+    if output is None:
+        output = io.BytesIO()
+    with timed("issue.save"):
+        save_document(issue, output)
+
+    if metrics is not None:
+        metrics.add_time("issue", time.perf_counter() - started)
+
+    if hasattr(output, "seek") and output.seekable():
+        output.seek(0)
+    return output
@@ -0,0 +1,211 @@
+# Optimasi gambar (opsional) untuk dokumen hasil build: gambar yang resolusinya
+# melebihi kebutuhan tampilan di kolom template diperkecil ke DPI target lalu
+# dikompres ulang (JPEG/PNG). Gambar identik diproses sekali dan part-nya digabung.
+import hashlib
+import io
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.packuri import PackURI
+from docx.oxml.ns import qn
+from docx.parts.image import ImagePart
+from lxml import etree
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow opsional: hanya dibutuhkan bila optimasi diaktifkan
+    Image = None
+
+# Nilai bawaan opsi optimasi (lihat optimize_document_images)
+DEFAULT_DPI = 150
+DEFAULT_JPEG_QUALITY = 85
+# Gambar yang lebih kecil dari ini tidak disentuh (hasilnya tidak sebanding)
+MIN_IMAGE_BYTES = 32 * 1024
+DEFAULT_OPTIONS = {"dpi": DEFAULT_DPI, "quality": DEFAULT_JPEG_QUALITY, "convert_png": True,
+                   "min_bytes": MIN_IMAGE_BYTES, "workers": None}
+# Batas atas thread per dokumen (opsi bisa datang dari klien layanan)
+MAX_WORKERS = os.cpu_count() or 1
+
+EMU_PER_INCH = 914400
+
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+# Setiap gambar inline/anchor: lebar tampil (wp:extent/@cx) dan rId blip-nya
+DRAWINGS_XPATH = etree.XPath("//wp:inline | //wp:anchor", namespaces={"wp": WP_NS})
+DRAWING_CX_XPATH = etree.XPath("wp:extent/@cx", namespaces={"wp": WP_NS})
+DRAWING_BLIP_XPATH = etree.XPath(".//a:blip/@r:embed", namespaces={"a": A_NS, "r": R_NS})
+
+# Format yang bisa dibaca & ditulis ulang; sisanya (EMF/WMF/GIF/TIFF...) dibiarkan
+OPTIMIZABLE_TYPES = {CT.JPEG: "JPEG", CT.PNG: "PNG"}
+
+
+def column_width_emu(doc):
+    """Lebar satu kolom teks di section terakhir template (EMU)."""
+    section = doc.sections[-1]
+    width = section.page_width - section.left_margin - section.right_margin
+    cols = section._sectPr.find(qn("w:cols"))
+    if cols is not None and int(cols.get(qn("w:num"), "1")) > 1:
+        num = int(cols.get(qn("w:num")))
+        space = int(cols.get(qn("w:space"), "720")) * 635  # twip -> EMU
+        width = (width - space * (num - 1)) // num
+    return width
+
+
+def display_widths(doc):
+    """Peta ImagePart -> lebar tampil terbesar (EMU) dari semua gambar di body `doc`."""
+    part = doc.part
+    widths = {}
+    for drawing in DRAWINGS_XPATH(doc.element.body):
+        cx = DRAWING_CX_XPATH(drawing)
+        for rId in DRAWING_BLIP_XPATH(drawing):
+            rel = part.rels.get(str(rId))
+            if rel is None or rel.is_external or not isinstance(rel.target_part, ImagePart):
+                continue
+            image_part = rel.target_part
+            widths[image_part] = max(widths.get(image_part, 0), int(cx[0]) if cx else 0)
+    return widths
+
+
+def _has_alpha(img):
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def image_options(spec):
+    """
+    Normalisasi opsi optimasi gambar: None/False = nonaktif (None), True = opsi
+    bawaan, dict = opsi bawaan yang ditimpa isi dict (kunci: lihat DEFAULT_OPTIONS).
+    """
+    if not spec:
+        return None
+    if Image is None:
+        raise ImportError("Optimasi gambar membutuhkan Pillow (pip install Pillow)")
+    options = dict(DEFAULT_OPTIONS)
+    if isinstance(spec, dict):
+        unknown = set(spec) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise ValueError(f"Opsi optimasi gambar tidak dikenal: {', '.join(sorted(unknown))}")
+        options.update(spec)
+    if not 0 < int(options["dpi"]):
+        raise ValueError("DPI target harus lebih dari 0")
+    if not 1 <= int(options["quality"]) <= 95:
+        raise ValueError("Kualitas JPEG harus di antara 1 dan 95")
+    if options["workers"] is not None:
+        options["workers"] = max(1, min(int(options["workers"]), MAX_WORKERS))
+    return options
+
+
+def optimize_blob(blob, content_type, target_width_px, quality=DEFAULT_JPEG_QUALITY, convert_png=True):
+    """
+    Perkecil (bila lebih lebar dari `target_width_px`) dan kompres ulang satu gambar.
+    Return (blob, content_type) baru, atau None bila hasilnya tidak lebih kecil.
+    PNG foto (tanpa transparansi, banyak warna) boleh diubah ke JPEG bila `convert_png`.
+    """
+    with Image.open(io.BytesIO(blob)) as img:
+        img.load()
+        if target_width_px and img.width > target_width_px:
+            height = max(1, round(img.height * target_width_px / img.width))
+            img = img.resize((target_width_px, height), Image.LANCZOS)
+
+        candidates = []
+        if content_type == CT.JPEG:
+            out = io.BytesIO()
+            img.convert("RGB").save(out, "JPEG", quality=quality, optimize=True)
+            candidates.append((out.getvalue(), CT.JPEG))
+        else:
+            out = io.BytesIO()
+            img.save(out, "PNG", optimize=True)
+            candidates.append((out.getvalue(), CT.PNG))
+            # Screenshot/diagram (sedikit warna) tetap PNG agar teksnya tajam
+            if convert_png and not _has_alpha(img) and img.convert("RGB").getcolors(256) is None:
+                out = io.BytesIO()
+                img.convert("RGB").save(out, "JPEG", quality=quality, optimize=True)
+                candidates.append((out.getvalue(), CT.JPEG))
+
+    best = min(candidates, key=lambda c: len(c[0]))
+    return best if len(best[0]) < len(blob) else None
+
+
+def _rename_for(part, content_type, partnames):
+    """Partname baru bila format gambar berubah (image3.png -> image3.jpeg)."""
+    ext = "jpeg" if content_type == CT.JPEG else "png"
+    base = posixpath.splitext(part.partname)[0]
+    candidate, n = PackURI(f"{base}.{ext}"), 1
+    while candidate in partnames:
+        candidate, n = PackURI(f"{base}_{n}.{ext}"), n + 1
+    partnames.add(candidate)
+    return candidate
+
+
+def optimize_document_images(doc, dpi=DEFAULT_DPI, quality=DEFAULT_JPEG_QUALITY, convert_png=True,
+                             min_bytes=MIN_IMAGE_BYTES, workers=None):
+    """
+    Optimasi semua gambar di body `doc` (di tempat). Resolusi target = lebar tampil
+    gambar (maksimal selebar kolom template) x `dpi`. Gambar dengan isi identik
+    diproses sekali dan rujukannya diarahkan ke satu part. Kompresi berjalan
+    paralel di thread pool (Pillow melepas GIL saat decode/resize/encode).
+
+    Return ringkasan: jumlah gambar, yang dioptimasi & digabung, serta byte
+    sebelum/sesudah dan yang dihemat.
+    """
+    if Image is None:
+        raise ImportError("Optimasi gambar membutuhkan Pillow (pip install Pillow)")
+
+    widths = display_widths(doc)
+    column = column_width_emu(doc)
+    stats = {"images": len(widths), "optimized": 0, "deduplicated": 0,
+             "bytes_before": sum(len(p.blob) for p in widths), "bytes_after": 0, "bytes_saved": 0}
+
+    # Gambar identik (mis. logo yang ditempel dua kali) -> satu part kanonik
+    canonical = {}
+    duplicates = {}
+    for part in widths:
+        digest = hashlib.sha256(part.blob).hexdigest()
+        first = canonical.setdefault(digest, part)
+        if first is not part:
+            duplicates[part] = first
+            widths[first] = max(widths[first], widths[part])
+            stats["deduplicated"] += 1
+    if duplicates:
+        for rel in doc.part.rels.values():
+            if not rel.is_external and rel.target_part in duplicates:
+                rel._target = duplicates[rel.target_part]
+
+    jobs = []
+    for part in canonical.values():
+        if part.content_type not in OPTIMIZABLE_TYPES or len(part.blob) < min_bytes:
+            continue
+        width_emu = min(widths[part] or column, column)
+        jobs.append((part, max(1, round(width_emu / EMU_PER_INCH * dpi))))
+
+    def run(job):
+        part, target_width_px = job
+        try:
+            return optimize_blob(part.blob, part.content_type, target_width_px, quality, convert_png)
+        except (OSError, ValueError):
+            # Gambar rusak/tidak dikenali Pillow: biarkan apa adanya
+            return None
+
+    if len(jobs) > 1 and (workers is None or workers > 1):
+        with ThreadPoolExecutor(max_workers=workers or min(len(jobs), os.cpu_count() or 1)) as pool:
+            results = list(pool.map(run, jobs))
+    else:
+        results = [run(job) for job in jobs]
+
+    partnames = {p.partname for p in doc.part.package.iter_parts()}
+    for (part, _), result in zip(jobs, results):
+        if result is None:
+            continue
+        blob, content_type = result
+        if content_type != part.content_type:
+            part.partname = _rename_for(part, content_type, partnames)
+            part._content_type = content_type
+        part._blob = blob
+        stats["optimized"] += 1
+
+    stats["bytes_after"] = sum(len(p.blob) for p in canonical.values())
+    stats["bytes_saved"] = stats["bytes_before"] - stats["bytes_after"]
+    return stats
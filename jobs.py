@@ -0,0 +1,409 @@
+# Eksekutor build di latar belakang: job dikirim ke pool proses terbatas,
+# diberi ID, progresnya bisa dipantau, dan bisa dibatalkan. Hasil disimpan
+# sebagai file .docx di direktori hasil dan di-cache per (template, naskah, data).
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import types
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
+
+from client import JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+from formatter import (BODY_CACHE, build_auto_docx, DOCUMENT_CACHE, enable_metrics_log, get_rule_pack, instrument,
+                       read_source_bytes, source_key, TEMPLATE_REGISTRY)
+from fidelity import IMAGES_COUNT, IMAGES_HASH, verify_output
+from images import image_options
+
+# Porsi progres untuk pemindahan isi; sisanya untuk menyimpan hasil
+BODY_PROGRESS_SHARE = 0.9
+
+
+logger = logging.getLogger("formatter.jobs")
+
+
+class BuildCancelled(Exception):
+    """Job dihentikan karena dibatalkan pengguna."""
+
+
+def job_key(template_hash, manuscript_hash, data_map, rules_key="", image_opts=None):
+    """Kunci cache hasil: hash template + hash naskah + hash data hasil deteksi, rule pack & opsi gambar."""
+    data_bytes = json.dumps([data_map, rules_key, image_opts], sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return "-".join(h[:24] for h in (template_hash, manuscript_hash, hashlib.sha256(data_bytes).hexdigest()))
+
+
+def job_source(source):
+    """
+    (sumber untuk worker, hash isinya). Path dikirim apa adanya: worker membaca
+    file itu sendiri dan hash dihitung lewat mmap. Sumber lain dikirim sebagai bytes.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source), source_key(source)
+    data = read_source_bytes(source)
+    return data, hashlib.sha256(data).hexdigest()
+
+
+@contextmanager
+def _neutral_main():
+    """
+    Proses anak (forkserver/spawn) mengimpor ulang modul __main__ induknya. Di
+    Streamlit __main__ = skrip UI, jadi selama proses baru dibuat __main__ diganti
+    modul kosong agar worker tidak ikut menjalankan UI.
+    """
+    main = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _init_worker(workers=1):
+    # Batas memori cache berlaku per proses: dibagi rata antar worker executor
+    DOCUMENT_CACHE.max_bytes //= workers
+    BODY_CACHE.max_bytes //= workers
+    # Baris JSON metrik dari worker ikut ke stderr seperti di proses utama
+    enable_metrics_log()
+
+
+def _warm_template(template_source):
+    # Parse & cek template sekarang, agar build pertama di worker ini tidak menunggunya
+    TEMPLATE_REGISTRY.get(template_source)
+
+
+def _run_build(job_id, template_source, manuscript_source, data_map, out_path,
+               progress_map, cancel_map, with_metrics=False, profile_path=None, rules=None,
+               optimize_images=None):
+    """
+    Isi job di proses worker. Progres & status batal dibagi lewat dict Manager.
+    Return laporan job: {"metrics": ..., "images": ..., "fidelity": ...} (None bila tidak ada).
+    Setiap hasil diverifikasi terhadap naskahnya (fidelity.verify_output).
+    """
+    if job_id in cancel_map:
+        raise BuildCancelled(job_id)
+    progress_map[job_id] = 0.0
+
+    # Dict Manager = panggilan IPC: laporkan hanya saat persentase berubah
+    last = [-1]
+
+    def on_progress(done, total):
+        percent = done * 100 // total
+        if percent == last[0]:
+            return
+        last[0] = percent
+        if job_id in cancel_map:
+            raise BuildCancelled(job_id)
+        progress_map[job_id] = BODY_PROGRESS_SHARE * done / total
+
+    report = {"metrics": None, "images": None, "fidelity": None}
+    tmp_path = f"{out_path}.{uuid.uuid4().hex[:8]}.tmp"
+    job = nullcontext()
+    if with_metrics or profile_path:
+        job = instrument(job_id=job_id, profile_path=profile_path)
+    try:
+        with job as job_metrics:
+            build_auto_docx(template_source, manuscript_source, data_map, output=tmp_path,
+                            progress=on_progress, rules=rules, optimize_images=optimize_images,
+                            report=report)
+            # Gambar yang dioptimasi memang berubah isinya: cukup dicek jumlahnya
+            report["fidelity"] = verify_output(manuscript_source, tmp_path, rules,
+                                               images=IMAGES_COUNT if optimize_images else IMAGES_HASH)
+        if job_metrics is not None:
+            report["metrics"] = job_metrics.as_dict()
+        # Hasil baru terlihat setelah lengkap ditulis
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        # Job gagal/batal tidak melaporkan metrik, jadi profilnya tidak pernah diambil
+        if profile_path and os.path.exists(profile_path):
+            os.remove(profile_path)
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    progress_map[job_id] = 1.0
+    return report
+
+
+class BuildJob:
+    """Satu permintaan build. Status dan progres dibaca dari future & dict bersama."""
+
+    def __init__(self, job_id, key, future, executor, result_path=None, report=None):
+        self.id = job_id
+        self.key = key
+        self.result_path = result_path
+        self._future = future
+        self._report = report  # laporan (images, fidelity) untuk job yang dilayani dari cache hasil
+        # Selesai setelah hasil didaftarkan executor (mis. sudah dipindah ke store)
+        self._settled = threading.Event()
+        if future is None:
+            self._settled.set()
+        self._executor = executor
+
+    @property
+    def status(self):
+        future = self._future
+        if future is None:
+            return JOB_DONE
+        if future.cancelled():
+            return JOB_CANCELLED
+        if not future.done():
+            return JOB_RUNNING if future.running() else JOB_QUEUED
+        if not self._settled.is_set():
+            return JOB_RUNNING
+        error = future.exception()
+        if error is None:
+            return JOB_DONE
+        return JOB_CANCELLED if isinstance(error, BuildCancelled) else JOB_FAILED
+
+    @property
+    def finished(self):
+        return self.status in (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+    @property
+    def progress(self):
+        """Perkiraan progres 0.0 - 1.0."""
+        if self.status == JOB_DONE:
+            return 1.0
+        return self._executor._progress.get(self.id, 0.0)
+
+    @property
+    def error(self):
+        if self.status != JOB_FAILED:
+            return None
+        error = self._future.exception()
+        return f"{type(error).__name__}: {error}"
+
+    @property
+    def metrics(self):
+        """Metrik job (dict JobMetrics.as_dict()) bila diminta saat submit."""
+        if self.status != JOB_DONE or self._future is None:
+            return None
+        return self._future.result()["metrics"]
+
+    def _report_value(self, name):
+        if self._future is None:
+            return (self._report or {}).get(name)
+        if self.status != JOB_DONE:
+            return None
+        return self._future.result()[name]
+
+    @property
+    def images(self):
+        """Ringkasan optimasi gambar (byte dihemat dst.) bila diaktifkan saat submit."""
+        return self._report_value("images")
+
+    @property
+    def fidelity(self):
+        """Laporan verifikasi struktur hasil terhadap naskah (fidelity.verify_output)."""
+        return self._report_value("fidelity")
+
+    def cancel(self):
+        """Batalkan job: yang masih antre langsung batal, yang berjalan berhenti di titik progres berikutnya."""
+        if self.finished:
+            return
+        if not self._future.cancel():
+            self._executor._cancel[self.id] = True
+
+    def result(self, timeout=None):
+        """Tunggu job selesai dan kembalikan path hasil (.docx)."""
+        if self._future is not None:
+            wait([self._future], timeout)
+            self._settled.wait(timeout)
+            self._future.result(0)
+        return self.result_path
+
+
+class BuildExecutor:
+    """
+    Pool proses terbatas untuk build_auto_docx, dipakai bersama oleh semua sesi.
+
+    Hasil di-cache sebagai file di `result_dir` dengan kunci job_key(); kiriman
+    yang identik langsung mendapat job yang sudah selesai (atau yang sedang
+    berjalan), tanpa build ulang. Dengan `store` (storage.BlobStore) hasil dipindah
+    ke store itu dan umurnya diatur kebijakan TTL/LRU store.
+
+    Setiap worker punya antrean sendiri dan job dibagi menurut pasangan
+    template/naskah, sehingga build ulang setelah bagian depan diedit jatuh ke
+    worker yang sama dan memakai BODY_CACHE-nya. Bila worker itu sedang sibuk
+    dan ada worker yang menganggur, job dikirim ke worker yang menganggur.
+    Worker yang mati (OOM, crash) diganti pool baru; job yang sedang dipegangnya gagal.
+    """
+
+    def __init__(self, max_workers=None, cache_entries=64, max_jobs=256, result_dir=None, store=None):
+        # forkserver: worker tidak di-fork dari proses server yang multi-thread
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            # Seluruh pipeline (python-docx, lxml, verifikasi) sudah diimpor sebelum worker di-fork
+            context.set_forkserver_preload(["jobs"])
+        else:
+            context = multiprocessing.get_context("spawn")
+        self._context = context
+        self._workers = max_workers or os.cpu_count()
+        self._pools = [self._new_pool() for _ in range(self._workers)]
+        self._pending = [0] * len(self._pools)  # job yang belum selesai per worker
+        with _neutral_main():
+            self._manager = context.Manager()
+        self._progress = self._manager.dict()
+        self._cancel = self._manager.dict()
+
+        self._own_dir = result_dir is None
+        self.result_dir = result_dir or tempfile.mkdtemp(prefix="formatter-jobs-")
+        os.makedirs(self.result_dir, exist_ok=True)
+
+        self.store = store
+        self.cache_entries = cache_entries
+        self.max_jobs = max_jobs
+        self._results = OrderedDict()   # key -> (path hasil yang sudah selesai, laporan images/fidelity)
+        self._inflight = {}             # key -> job yang belum selesai
+        self._jobs = OrderedDict()      # job_id -> BuildJob
+        self._lock = threading.Lock()
+
+    def submit(self, template_file, manuscript_file, data_map, with_metrics=False, profile_path=None,
+               rules=None, optimize_images=None):
+        """
+        Kirim build ke pool dan kembalikan BuildJob (segera, tanpa menunggu).
+        Sebaiknya berupa path (mis. dari BlobStore) agar isi file tidak ikut dikirim ke worker.
+        """
+        template_source, template_hash = job_source(template_file)
+        manuscript_source, manuscript_hash = job_source(manuscript_file)
+        data_map = dict(data_map)
+        # Worker menerima spesifikasi pack (dict), bukan nama: hasilnya sama walau file pack diubah
+        rules = get_rule_pack(rules)
+        image_opts = image_options(optimize_images)
+        key = job_key(template_hash, manuscript_hash, data_map, rules.key, image_opts)
+
+        with self._lock:
+            path, report = self._results.get(key, (None, None))
+            if path is not None and self._result_exists(path):
+                self._results.move_to_end(key)
+                return self._register(BuildJob(uuid.uuid4().hex[:12], key, None, self, path, report))
+
+            job = self._inflight.get(key)
+            if job is not None and not job.finished:
+                return job
+
+            job_id = uuid.uuid4().hex[:12]
+            out_path = os.path.join(self.result_dir, f"{key}.docx")
+            index = self._worker_for(key)
+            pool, future = self._submit_to(
+                index, _run_build, job_id, template_source, manuscript_source, data_map,
+                out_path, self._progress, self._cancel, with_metrics, profile_path, rules.spec,
+                image_opts,
+            )
+            self._pending[index] += 1
+            job = self._register(BuildJob(job_id, key, future, self, out_path))
+            self._inflight[key] = job
+
+        future.add_done_callback(lambda f, job=job, index=index, pool=pool: self._on_done(job, index, pool))
+        return job
+
+    def warm(self, template_file):
+        """
+        Siapkan template di setiap worker (mis. segera setelah diunggah), agar build
+        pertama tidak ikut menunggu parse template. Return future per worker.
+        """
+        template_source, _ = job_source(template_file)
+        with self._lock:
+            return [self._submit_to(index, _warm_template, template_source)[1]
+                    for index in range(len(self._pools))]
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=1, mp_context=self._context, initializer=_init_worker,
+                                   initargs=(self._workers,))
+
+    def _submit_to(self, index, fn, *args):
+        # Dipanggil dengan self._lock dipegang. Worker baru dibuat pool saat submit.
+        with _neutral_main():
+            try:
+                pool = self._pools[index]
+                return pool, pool.submit(fn, *args)
+            except BrokenProcessPool:
+                self._replace_pool(index, pool)
+                pool = self._pools[index]
+                return pool, pool.submit(fn, *args)
+
+    def _replace_pool(self, index, broken):
+        # Dipanggil dengan self._lock dipegang; pool yang sudah diganti tidak diganti lagi
+        if self._pools[index] is not broken:
+            return
+        logger.warning("Worker build %d mati; diganti worker baru", index)
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._pools[index] = self._new_pool()
+
+    def _worker_for(self, key):
+        # Kunci = hash template - hash naskah - hash data; data tidak ikut menentukan worker
+        template_hash, manuscript_hash, _ = key.split("-")
+        index = int(template_hash + manuscript_hash, 16) % len(self._pools)
+        if self._pending[index]:
+            # Worker tujuan sibuk: pakai worker yang menganggur (BODY_CACHE-nya dilewatkan)
+            idle = [i for i, pending in enumerate(self._pending) if not pending]
+            if idle:
+                return idle[0]
+        return index
+
+    def _result_exists(self, path):
+        if self.store is not None:
+            return self.store.touch(path)
+        return os.path.exists(path)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _register(self, job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+        return job
+
+    def _on_done(self, job, index, pool):
+        try:
+            with self._lock:
+                self._pending[index] -= 1
+                if not job._future.cancelled() and isinstance(job._future.exception(), BrokenProcessPool):
+                    self._replace_pool(index, pool)
+            self._register_result(job)
+        finally:
+            job._settled.set()
+
+    def _register_result(self, job):
+        self._progress.pop(job.id, None)
+        self._cancel.pop(job.id, None)
+        with self._lock:
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+        # Status job belum DONE sampai fungsi ini selesai: cek future-nya langsung
+        future = job._future
+        if future.cancelled() or future.exception() is not None:
+            return
+        report = future.result()
+        if self.store is not None:
+            # Hasil identik (mis. beda data_map tapi keluaran sama) disimpan sekali
+            job.result_path = self.store.put(job.result_path, move=True)
+            metrics = report["metrics"]
+            if metrics is not None and metrics["profile"]:
+                # Profil cProfile ikut TTL & batas ukuran store, bukan menumpuk di direktori temp
+                metrics["profile"] = self.store.put(metrics["profile"], move=True)
+        with self._lock:
+            self._results[job.key] = (job.result_path, {"images": report["images"], "fidelity": report["fidelity"]})
+            self._results.move_to_end(job.key)
+            while len(self._results) > self.cache_entries:
+                _, (path, _) = self._results.popitem(last=False)
+                # File di store bisa dipakai hasil lain; dibuang oleh kebijakan store
+                if self.store is None and os.path.exists(path):
+                    os.remove(path)
+
+    def shutdown(self, wait=True):
+        for pool in self._pools:
+            pool.shutdown(wait=wait, cancel_futures=True)
+        self._manager.shutdown()
+        if self._own_dir:
+            shutil.rmtree(self.result_dir, ignore_errors=True)
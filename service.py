@@ -0,0 +1,458 @@
+# Layanan formatter lokal yang berjalan terus: HTTP lewat TCP atau Unix socket.
+# Import python-docx/lxml, template yang sudah di-parse, rule pack yang sudah
+# dikompilasi, dan pool worker build (jobs.BuildExecutor) disiapkan sekali lalu
+# dipakai semua permintaan, jadi satu naskah cukup membayar build-nya sendiri.
+# Klien: client.ServiceClient (UI Streamlit, sistem submission, skrip).
+#
+# Contoh:
+#   python service.py                                   # http://127.0.0.1:8765
+#   python service.py --socket /tmp/formatter.sock -j 4
+#   curl --unix-socket /tmp/formatter.sock http://x/health
+#
+# Endpoint (JSON kecuali unggahan & hasil):
+#   GET    /health                 status, jumlah worker & job, ukuran store
+#   GET    /rules                  nama rule pack
+#   GET    /options                rule pack, style per bagian, bawaan optimasi gambar (untuk UI)
+#   POST   /files[?session=&role=] isi .docx -> {"id", "size"} (role=template: template disiapkan di worker)
+#   HEAD   /files/<id>             200 bila file masih ada di store
+#   GET    /templates/<id>[?rules=] {"id", "missing_styles"} (plus style rule pack `rules`)
+#   POST   /detect                 {"manuscript", "rules"?, "metrics"?, "profile"?} -> {"sections", "metrics"}
+#   POST   /jobs[?wait=detik]      {"template", "manuscript", "data"?, "rules"?, "optimize_images"?,
+#                                   "metrics"?, "profile"?} -> info job (tanpa "data": dideteksi otomatis)
+#   GET    /jobs/<id>[?wait=detik] info job: status, progress, error, images, fidelity, metrics
+#   GET    /jobs/<id>/result       isi .docx hasil
+#   DELETE /jobs/<id>              batalkan job
+import argparse
+import atexit
+import errno
+import json
+import logging
+import os
+import re
+import shutil
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import urllib.parse
+import uuid
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from client import DOCX_MIME, ServiceError
+from formatter import (auto_detect_sections, available_rule_packs, DEFAULT_RULE_PACK, enable_metrics_log,
+                       get_rule_pack, instrument, RULES_DIR, STYLE_MAPPING, TEMPLATE_REGISTRY)
+from images import DEFAULT_DPI, DEFAULT_JPEG_QUALITY, Image
+from jobs import BuildExecutor, JOB_DONE
+from storage import BlobStore, COPY_CHUNK_SIZE, QuotaExceeded
+
+logger = logging.getLogger("formatter.service")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Unggahan yang lebih besar dari ini ditolak sebelum dibaca
+MAX_UPLOAD_BYTES = 256 * 1024 * 1024
+# Unggahan di bawah ukuran ini ditampung di memori, selebihnya di file sementara
+SPOOL_BYTES = 8 * 1024 * 1024
+# Batas ?wait= (detik) agar koneksi tidak tertahan tanpa batas
+MAX_WAIT = 600
+
+FILE_ID = r"(?P<file_id>[0-9a-f]{64})"
+JOB_ID = r"(?P<job_id>[0-9a-f]{12})"
+FILE_ROLES = (None, "template", "manuscript")
+
+
+class FormatterService:
+    """
+    Inti layanan tanpa HTTP: store unggahan/hasil (storage.BlobStore) dan pool
+    build bersama (jobs.BuildExecutor). File dirujuk dengan id = hash isinya.
+    """
+
+    def __init__(self, store=None, executor=None, max_workers=None):
+        self.store = store or BlobStore()
+        self.executor = executor or BuildExecutor(max_workers, store=self.store)
+
+    def health(self):
+        return {"status": "ok", "workers": len(self.executor._pools), "jobs": len(self.executor._jobs),
+                "store_bytes": self.store.total_bytes}
+
+    def rules(self):
+        return {"rules": available_rule_packs()}
+
+    def options(self):
+        return {"rules": available_rule_packs(), "styles": STYLE_MAPPING,
+                "images": {"dpi": DEFAULT_DPI, "quality": DEFAULT_JPEG_QUALITY, "available": Image is not None}}
+
+    def put_file(self, stream, session=None, role=None):
+        if role not in FILE_ROLES:
+            raise ValueError(f"Peran file tidak dikenal: {role}")
+        path = self.store.put(stream, session=session)
+        info = {"id": _file_id(path), "size": os.path.getsize(path)}
+        if role == "template":
+            # Parse di layanan (cek style) dan di setiap worker sekarang, bukan saat build pertama
+            info["missing_styles"] = TEMPLATE_REGISTRY.get(path).missing_styles
+            self.executor.warm(path)
+        return info
+
+    def file_path(self, file_id, session=None):
+        path = self.store.get(file_id, session) if isinstance(file_id, str) else None
+        if path is None:
+            raise ServiceError(404, f"File {file_id} tidak ada di store (belum diunggah atau sudah dibuang)")
+        return path
+
+    def template(self, file_id, rules=None):
+        template = TEMPLATE_REGISTRY.get(self.file_path(file_id))
+        return {"id": file_id, "missing_styles": template.missing_styles_for(self.rule_pack(rules))}
+
+    def rule_pack(self, name):
+        """
+        Rule pack dari nama yang terdaftar (available_rule_packs). Path file dan
+        spesifikasi inline (regex bebas) dari klien tidak diterima.
+        """
+        if name is None or name == DEFAULT_RULE_PACK["name"]:
+            return get_rule_pack(None)
+        if not isinstance(name, str) or name not in available_rule_packs():
+            raise ValueError(f"Rule pack '{name}' tidak dikenal (lihat GET /rules)")
+        return get_rule_pack(os.path.join(RULES_DIR, f"{name}.json"))
+
+    def detect(self, spec):
+        path = self.file_path(spec.get("manuscript"))
+        rules = self.rule_pack(spec.get("rules"))
+        job = nullcontext()
+        if spec.get("metrics") or spec.get("profile"):
+            job = instrument(profile_path=new_profile_path() if spec.get("profile") else None)
+        with job as metrics:
+            sections = auto_detect_sections(path, rules=rules)
+        if metrics is None:
+            return {"sections": sections, "metrics": None}
+        info = metrics.as_dict()
+        if info["profile"]:
+            # Profil ikut TTL & batas ukuran store (lihat BuildExecutor._register_result)
+            info["profile"] = self.store.put(info["profile"], move=True)
+        return {"sections": sections, "metrics": info}
+
+    def submit(self, spec, wait=None):
+        template_path = self.file_path(spec.get("template"))
+        manuscript_path = self.file_path(spec.get("manuscript"))
+        rules = self.rule_pack(spec.get("rules"))
+        data = spec.get("data")
+        detected = data is None
+        if detected:
+            data = auto_detect_sections(manuscript_path, rules=rules)
+        elif not isinstance(data, dict) or not all(isinstance(value, str) for value in data.values()):
+            raise ValueError("'data' harus berupa objek {bagian: teks}")
+        job = self.executor.submit(
+            template_path, manuscript_path, data,
+            with_metrics=bool(spec.get("metrics")),
+            profile_path=new_profile_path() if spec.get("profile") else None,
+            rules=rules, optimize_images=spec.get("optimize_images"),
+        )
+        info = self._wait(job, wait)
+        if detected:
+            info["sections"] = data
+        return info
+
+    def _job(self, job_id):
+        job = self.executor.get(job_id)
+        if job is None:
+            raise ServiceError(404, f"Job {job_id} tidak dikenal")
+        return job
+
+    def job(self, job_id, wait=None):
+        return self._wait(self._job(job_id), wait)
+
+    def cancel(self, job_id):
+        job = self._job(job_id)
+        job.cancel()
+        return job_info(job)
+
+    def result_path(self, job_id):
+        job = self._job(job_id)
+        if job.status != JOB_DONE:
+            raise ServiceError(409, f"Job {job_id} belum selesai (status: {job.status})")
+        if not self.store.touch(job.result_path):
+            raise ServiceError(410, f"Hasil job {job_id} sudah dibuang dari store; kirim ulang build-nya")
+        return job.result_path
+
+    def _wait(self, job, wait):
+        if wait:
+            try:
+                job.result(min(float(wait), MAX_WAIT))
+            except Exception:
+                pass  # gagal/batal/belum selesai: dilaporkan lewat status & error di info job
+        return job_info(job)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+def job_info(job):
+    """Info job yang dikirim ke klien (siap json.dump)."""
+    info = {"id": job.id, "status": job.status, "finished": job.finished,
+            "progress": round(job.progress, 3), "error": job.error}
+    if info["status"] == JOB_DONE:
+        info.update(images=job.images, fidelity=job.fidelity, metrics=job.metrics)
+    return info
+
+
+def new_profile_path():
+    return os.path.join(tempfile.gettempdir(), f"formatter-{uuid.uuid4().hex[:12]}.prof")
+
+
+def _file_id(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Terjemahan HTTP <-> FormatterService (self.server.service)."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "FormatterService/1"
+
+    # (method, pola path, nama handler)
+    ROUTES = [
+        ("GET", r"/health", "health"),
+        ("GET", r"/rules", "rules"),
+        ("GET", r"/options", "options"),
+        ("POST", r"/files", "upload"),
+        ("HEAD", rf"/files/{FILE_ID}", "file_exists"),
+        ("GET", rf"/templates/{FILE_ID}", "template"),
+        ("POST", r"/detect", "detect"),
+        ("POST", r"/jobs", "submit"),
+        ("GET", rf"/jobs/{JOB_ID}", "job"),
+        ("GET", rf"/jobs/{JOB_ID}/result", "result"),
+        ("DELETE", rf"/jobs/{JOB_ID}", "cancel"),
+    ]
+    ROUTES = [(method, re.compile(pattern + "$"), name) for method, pattern, name in ROUTES]
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_HEAD(self):
+        self._dispatch("HEAD")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            allowed = False
+            for route_method, pattern, name in self.ROUTES:
+                match = pattern.match(url.path)
+                if match is None:
+                    continue
+                allowed = True
+                if route_method == method:
+                    return getattr(self, f"route_{name}")(query, **match.groupdict())
+            if allowed:
+                raise ServiceError(405, f"Metode {method} tidak didukung untuk {url.path}")
+            raise ServiceError(404, f"Endpoint {url.path} tidak dikenal")
+        except ServiceError as e:
+            self._send_error(e.status, str(e))
+        except QuotaExceeded as e:
+            self._send_error(413, str(e))
+        except (ValueError, ImportError) as e:
+            self._send_error(400, str(e))
+        except Exception as e:
+            logger.exception("Permintaan %s %s gagal", method, self.path)
+            self._send_error(500, f"{type(e).__name__}: {e}")
+
+    # --- Handler per endpoint ---
+    def route_health(self, query):
+        self._send_json(self.server.service.health())
+
+    def route_rules(self, query):
+        self._send_json(self.server.service.rules())
+
+    def route_options(self, query):
+        self._send_json(self.server.service.options())
+
+    def route_upload(self, query):
+        with self._read_body() as body:
+            info = self.server.service.put_file(body, session=query.get("session"), role=query.get("role"))
+        self._send_json(info, status=201)
+
+    def route_file_exists(self, query, file_id):
+        self.server.service.file_path(file_id, session=query.get("session"))
+        self._send_json(None)
+
+    def route_template(self, query, file_id):
+        self._send_json(self.server.service.template(file_id, rules=query.get("rules")))
+
+    def route_detect(self, query):
+        self._send_json(self.server.service.detect(self._read_json()))
+
+    def route_submit(self, query):
+        self._send_json(self.server.service.submit(self._read_json(), wait=query.get("wait")), status=202)
+
+    def route_job(self, query, job_id):
+        self._send_json(self.server.service.job(job_id, wait=query.get("wait")))
+
+    def route_cancel(self, query, job_id):
+        self._send_json(self.server.service.cancel(job_id))
+
+    def route_result(self, query, job_id):
+        path = self.server.service.result_path(job_id)
+        with open(path, "rb") as f:
+            self.send_response(200)
+            self.send_header("Content-Type", DOCX_MIME)
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile, COPY_CHUNK_SIZE)
+
+    # --- Baca/tulis ---
+    def _content_length(self):
+        length = self.headers.get("Content-Length")
+        if length is None:
+            raise ServiceError(411, "Header Content-Length wajib ada")
+        length = int(length)
+        if length > MAX_UPLOAD_BYTES:
+            raise ServiceError(413, f"Isi permintaan melebihi {MAX_UPLOAD_BYTES // 1024 // 1024} MB")
+        return length
+
+    def _read_body(self):
+        """Isi permintaan di file sementara (memori dulu, disk bila besar), siap disimpan ke store."""
+        remaining = self._content_length()
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        while remaining:
+            chunk = self.rfile.read(min(remaining, COPY_CHUNK_SIZE))
+            if not chunk:
+                body.close()
+                raise ServiceError(400, "Isi permintaan terputus")
+            body.write(chunk)
+            remaining -= len(chunk)
+        body.seek(0)
+        return body
+
+    def _read_json(self):
+        data = self.rfile.read(self._content_length())
+        try:
+            payload = json.loads(data or b"{}")
+        except ValueError:
+            raise ServiceError(400, "Isi permintaan bukan JSON yang valid")
+        if not isinstance(payload, dict):
+            raise ServiceError(400, "Isi permintaan harus berupa objek JSON")
+        return payload
+
+    def _send_json(self, payload, status=200):
+        data = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _send_error(self, status, message):
+        # Isi permintaan yang belum dibaca membuat koneksi tidak bisa dipakai ulang
+        self.close_connection = True
+        self._send_json({"error": message}, status=status)
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Seperti ThreadingHTTPServer, tetapi mendengarkan di Unix socket."""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        path = self.server_address
+        if os.path.lexists(path):
+            # Hanya socket basi (proses sebelumnya berhenti tanpa membersihkan) yang diganti
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise OSError(errno.EEXIST, "Path sudah ada dan bukan socket", path)
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(path)
+            else:
+                raise OSError(errno.EADDRINUSE, "Socket sedang dipakai layanan lain", path)
+            finally:
+                probe.close()
+        super().server_bind()
+        self._socket_inode = os.stat(path).st_ino
+
+    def server_close(self):
+        super().server_close()
+        # Hapus file socket bila masih milik server ini
+        path = self.server_address
+        try:
+            if os.stat(path).st_ino == self._socket_inode:
+                os.remove(path)
+        except (AttributeError, FileNotFoundError):
+            pass
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)  # BaseHTTPRequestHandler mengharapkan (host, port)
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """Server HTTP (thread per koneksi) untuk `service` di host:port, atau di `socket_path`."""
+    if socket_path:
+        server = UnixHTTPServer(socket_path, ServiceHandler)
+        server.url = f"unix://{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+        server.url = f"http://{host}:{server.server_address[1]}"
+    server.service = service
+    return server
+
+
+def serve_in_background(service=None, socket_path=None):
+    """
+    Jalankan layanan di thread latar proses ini (mis. UI Streamlit tanpa layanan
+    terpisah) dan kembalikan server-nya; alamatnya di `server.url`. Bawaannya
+    Unix socket baru di direktori sementara, atau port bebas di 127.0.0.1.
+    """
+    # Metrik job & log permintaan ke stderr
+    enable_metrics_log(logger)
+    service = service or FormatterService()
+    if socket_path is None and hasattr(socket, "AF_UNIX"):
+        socket_path = os.path.join(tempfile.gettempdir(), f"formatter-{uuid.uuid4().hex[:12]}.sock")
+    server = make_server(service, port=0, socket_path=socket_path)
+    # File socket dihapus saat proses berakhir
+    atexit.register(server.server_close)
+    threading.Thread(target=server.serve_forever, name="formatter-service", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan formatter lokal (HTTP lewat TCP atau Unix socket).")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Alamat TCP (bawaan: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port TCP (bawaan: {DEFAULT_PORT})")
+    parser.add_argument("--socket", default=None, help="Dengarkan di Unix socket ini alih-alih TCP")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Jumlah worker build (bawaan: jumlah core)")
+    parser.add_argument("--store", default=None, help="Direktori store unggahan & hasil (bawaan: <tmp>/formatter-store)")
+    args = parser.parse_args(argv)
+
+    # Metrik job & log permintaan ke stderr
+    enable_metrics_log(logger)
+    service = FormatterService(store=BlobStore(args.store), max_workers=args.jobs)
+    server = make_server(service, args.host, args.port, args.socket)
+    # SIGTERM (systemd, docker stop) berhenti seperti Ctrl+C: socket & worker dibersihkan
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Layanan formatter siap di {server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+# Penyimpanan file berbasis isi (content-addressed) di disk untuk unggahan dan
+# hasil build: setiap isi disimpan sekali (nama file = hash SHA-256), dibatasi
+# kuota per sesi, total ukuran, dan umur (TTL). Entri yang paling lama tidak
+# dipakai dibuang lebih dulu. Pipeline cukup menerima path-nya, jadi isi file
+# tidak perlu disalin ke memori proses.
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_SESSION_QUOTA = 256 * 1024 * 1024
+DEFAULT_TTL = 6 * 3600
+# Entri yang baru dipakai (mis. sedang dibaca worker build) tidak dibuang
+DEFAULT_GRACE = 300
+COPY_CHUNK_SIZE = 1024 * 1024
+STORE_SUFFIX = ".docx"
+# Nama file milik store: root/ab/<sha256>.docx dan sisa penulisan root/.<uuid>.tmp
+BLOB_NAME_RE = re.compile(r"([0-9a-f]{64})" + re.escape(STORE_SUFFIX) + "$")
+TMP_NAME_RE = re.compile(r"\.[0-9a-f]{32}\.tmp$")
+
+
+class QuotaExceeded(ValueError):
+    """File lebih besar dari kuota penyimpanan satu sesi."""
+
+
+class BlobStore:
+    """
+    Direktori file .docx berbasis isi: `root/ab/abcdef....docx`.
+
+    - put() menyalin (atau memindahkan) sumber ke store sambil menghitung hashnya;
+      isi yang sudah ada tidak ditulis ulang (unggahan identik = satu file).
+    - Setiap sesi punya kuota; bila terlampaui, file sesi yang paling lama tidak
+      dipakai (dan tidak dirujuk sesi lain) dihapus lebih dulu, kecuali yang masih
+      dalam `grace`. Sesi yang tidak aktif lebih dari `ttl` dilepas.
+    - File yang tidak dipakai lebih dari `ttl` detik, atau yang paling lama tidak
+      dipakai saat total melebihi `max_bytes`, dihapus (kecuali dalam `grace`).
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES, session_quota=DEFAULT_SESSION_QUOTA,
+                 ttl=DEFAULT_TTL, grace=DEFAULT_GRACE):
+        self.root = root or os.path.join(tempfile.gettempdir(), "formatter-store")
+        self.max_bytes = max_bytes
+        self.session_quota = session_quota
+        self.ttl = ttl
+        self.grace = grace
+        self._entries = OrderedDict()  # path -> [ukuran, terakhir dipakai], urutan LRU
+        self._sessions = {}            # sesi -> OrderedDict(path -> None), urutan LRU per sesi
+        self._session_seen = {}        # sesi -> terakhir aktif
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # Isi store dari proses sebelumnya: diurutkan menurut waktu ubah terakhir. Hanya
+        # nama milik store yang disentuh; file lain di direktori ini dibiarkan.
+        found = []
+        stale = time.time() - self.grace
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if TMP_NAME_RE.match(name):
+                # Sisa penulisan yang terputus (yang masih baru bisa milik proses lain)
+                if os.path.isfile(path) and os.stat(path).st_mtime < stale:
+                    os.remove(path)
+                continue
+            if len(name) != 2 or not os.path.isdir(path):
+                continue
+            for blob in os.listdir(path):
+                match = BLOB_NAME_RE.match(blob)
+                if match is None or not match.group(1).startswith(name):
+                    continue
+                stat = os.stat(os.path.join(path, blob))
+                found.append((stat.st_mtime, os.path.join(path, blob), stat.st_size))
+        for mtime, path, size in sorted(found):
+            self._entries[path] = [size, mtime]
+            self._total_bytes += size
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def usage(self, session):
+        """Total ukuran file yang dirujuk `session` (file yang sama dihitung sekali)."""
+        with self._lock:
+            return self._session_bytes(session)
+
+    def put(self, source, session=None, move=False):
+        """
+        Simpan `source` (path, bytes, atau objek file seperti UploadedFile) dan
+        kembalikan path-nya di store. `move` memindahkan file sumber (path) alih-alih
+        menyalinnya. Raise QuotaExceeded (tanpa menyimpan apa pun) bila file sendiri
+        sudah melebihi kuota sesi.
+        """
+        if move and isinstance(source, (str, os.PathLike)):
+            digest, size = _hash_file(source)
+            self._check_quota(session, size)
+            path = self._path_for(digest)
+            if os.path.exists(path):
+                os.remove(source)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                shutil.move(source, path)
+        else:
+            tmp_path = os.path.join(self.root, f".{uuid.uuid4().hex}.tmp")
+            try:
+                digest, size = _copy_hashed(source, tmp_path)
+                self._check_quota(session, size)
+                path = self._path_for(digest)
+                if os.path.exists(path):
+                    os.remove(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self._entries[path] = [size, time.time()]
+                self._total_bytes += size
+            else:
+                entry[1] = time.time()
+                self._entries.move_to_end(path)
+            if session is not None:
+                refs = self._sessions.setdefault(session, OrderedDict())
+                refs[path] = None
+                refs.move_to_end(path)
+                self._session_seen[session] = time.time()
+                # Buang file lama sesi ini sampai kembali di bawah kuota. File yang baru
+                # dipakai (mis. masih dibaca build yang antre/berjalan) tidak dibuang:
+                # berhenti di situ, sisanya dibuang pada put() berikutnya.
+                grace_start = time.time() - self.grace
+                while self._session_bytes(session) > self.session_quota:
+                    old = next(iter(refs))
+                    entry = self._entries.get(old)
+                    if entry is not None and entry[1] > grace_start:
+                        break
+                    del refs[old]
+                    if entry is not None and not self._referenced(old):
+                        self._remove(old, entry[0])
+            self._evict()
+        return path
+
+    def _check_quota(self, session, size):
+        if session is not None and size > self.session_quota:
+            raise QuotaExceeded(
+                f"File {size / 1024 / 1024:.1f} MB melebihi kuota sesi "
+                f"{self.session_quota / 1024 / 1024:.1f} MB")
+
+    def get(self, digest, session=None):
+        """Path file berhash `digest` (ditandai baru dipakai), atau None bila tidak ada di store."""
+        path = self._path_for(digest)
+        return path if self.touch(path, session) else None
+
+    def touch(self, path, session=None):
+        """Tandai `path` (dan `session`) baru dipakai. False bila file sudah tidak ada di store."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or not os.path.exists(path):
+                return False
+            entry[1] = time.time()
+            self._entries.move_to_end(path)
+            refs = self._sessions.get(session)
+            if refs is not None:
+                self._session_seen[session] = entry[1]
+                if path in refs:
+                    refs.move_to_end(path)
+            return True
+
+    def release(self, session):
+        """Lepas semua rujukan sesi (file-nya tetap ada sampai dibuang TTL/LRU)."""
+        with self._lock:
+            self._release(session)
+
+    def _release(self, session):
+        self._sessions.pop(session, None)
+        self._session_seen.pop(session, None)
+
+    def evict(self):
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        now = time.time()
+        expired = now - self.ttl
+        # Sesi yang sudah lama tidak aktif (tab ditutup, klien berhenti) dilepas
+        for session, seen in list(self._session_seen.items()):
+            if seen < expired:
+                self._release(session)
+        for path, (size, last_used) in list(self._entries.items()):
+            if last_used > now - self.grace:
+                break
+            if last_used > expired and self._total_bytes <= self.max_bytes:
+                break
+            self._remove(path, size)
+
+    def _remove(self, path, size):
+        del self._entries[path]
+        self._total_bytes -= size
+        for refs in self._sessions.values():
+            refs.pop(path, None)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _referenced(self, path):
+        return any(path in refs for refs in self._sessions.values())
+
+    def _session_bytes(self, session):
+        return sum(self._entries[path][0] for path in self._sessions.get(session, ())
+                   if path in self._entries)
+
+    def _path_for(self, digest):
+        return os.path.join(self.root, digest[:2], digest + STORE_SUFFIX)
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _copy_hashed(source, dest_path):
+    """Salin `source` ke `dest_path` per potongan sambil menghitung SHA-256-nya."""
+    digest = hashlib.sha256()
+    with open(dest_path, "wb") as out:
+        def write(chunk):
+            digest.update(chunk)
+            out.write(chunk)
+
+        if isinstance(source, (bytes, bytearray)):
+            write(source)
+            size = len(source)
+        elif isinstance(source, (str, os.PathLike)):
+            size = 0
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+                    write(chunk)
+                    size += len(chunk)
+        elif hasattr(source, "getbuffer"):
+            # BytesIO/UploadedFile: tulis langsung dari buffer-nya, tanpa salinan bytes
+            with source.getbuffer() as view:
+                write(view)
+                size = view.nbytes
+        else:
+            pos = source.tell()
+            source.seek(0)
+            size = 0
+            try:
+                for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b""):
+                    write(chunk)
+                    size += len(chunk)
+            finally:
+                source.seek(pos)
+    return digest.hexdigest(), size
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul proyek ada di root repo (bukan paket terpasang)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+# Regresi auto_detect_sections terhadap fungsi lama (sebelum state machine).
+#
+# fixtures/detect_corpus.json  = paragraf tiap naskah uji
+# fixtures/detect_baseline.json = keluaran auto_detect_sections lama (commit baseline)
+#                                 untuk naskah yang sama
+#
+# Hasil harus sama persis dengan baseline, kecuali perbedaan yang disengaja di
+# INTENDED_DIVERGENCES.
+import io
+import json
+import os
+
+import pytest
+from docx import Document
+
+from formatter import auto_detect_sections
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+with open(os.path.join(FIXTURES, "detect_corpus.json"), encoding="utf-8") as f:
+    CORPUS = json.load(f)
+with open(os.path.join(FIXTURES, "detect_baseline.json"), encoding="utf-8") as f:
+    BASELINE = json.load(f)
+
+# naskah -> {bagian: hasil baru}; bagian lain tetap harus sama dengan baseline
+INTENDED_DIVERGENCES = {
+    # Abstrak tanpa baris Kata Kunci berhenti di judul abstrak berikutnya,
+    # bukan menelan sisa naskah
+    "tanpa_kata_kunci": {"Abstrak": "Abstrakisi"},
+    # Abstract tanpa Keywords juga ditutup judul Abstrak dan baris Kata Kunci (versi lama
+    # hanya Keywords/Pendahuluan), agar abstrak & kata kunci Indonesia tidak ikut tertelan
+    "abstract_tanpa_keywords_dulu": {"Abstract (EN)": "Abstracten en two"},
+    "abstract_tanpa_keywords_kata_kunci": {"Abstract (EN)": "Abstracten en two"},
+    # Tanpa abstrak, isi naskah setelah Bab 1 tidak lagi masuk Afiliasi
+    "tanpa_abstrak": {"Afiliasi": "Universitas X"},
+}
+
+
+def make_docx(paragraphs):
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def expected_sections(name):
+    return {**BASELINE[name], **INTENDED_DIVERGENCES.get(name, {})}
+
+
+def test_corpus_matches_baseline():
+    assert set(CORPUS) == set(BASELINE)
+    assert set(INTENDED_DIVERGENCES) <= set(CORPUS)
+
+
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_detect_from_bytes(name):
+    # Jalur streaming (iter_paragraph_texts) seperti dipakai batch & layanan
+    assert auto_detect_sections(make_docx(CORPUS[name])) == expected_sections(name)
+
+
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_detect_from_document(name):
+    doc = Document(io.BytesIO(make_docx(CORPUS[name])))
+    assert auto_detect_sections(doc) == expected_sections(name)
+
+
+@pytest.mark.parametrize("name", sorted(INTENDED_DIVERGENCES))
+def test_intended_divergences(name):
+    # Perbedaan ini memang disengaja: pastikan baseline memang berbeda di bagian tsb
+    for section, value in INTENDED_DIVERGENCES[name].items():
+        assert BASELINE[name][section] != value